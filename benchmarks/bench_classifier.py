@@ -0,0 +1,102 @@
+# =========================
+# Throughput benchmark: classifier against the local fake OpenAI server
+# =========================
+# No API spend, no network: an in-process fake_openai_server.py answers every call.
+#   python benchmarks/bench_classifier.py --rows 200 1000 5000 --latency 0.3 --json bench.json
+# Reports rows/s, API calls, items and tokens per scenario so perf changes can be compared run to run.
+
+from __future__ import annotations
+import os, sys, json, time, random, argparse, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import llmclassifier as L
+from fake_openai_server import start_fake_server
+
+ISSUES = ["battery drains fast", "camera is blurry at night", "screen flickers after the update",
+          "wifi keeps dropping", "what is the price of", "charging is slow with the original charger",
+          "apps crash since the update", "just got my new phone, loving it"]
+PRODUCTS = ["Galaxy S24", "Galaxy S24 Ultra", "Galaxy A55", "Galaxy Z Flip5", "Galaxy Tab S9", "Galaxy Watch6", "my phone"]
+AUTHORS = ["member1", "member2", "Samsung_Global_Contents", "pntv1905"] + [f"user{i}" for i in range(200)]
+
+# name -> run_pipeline kwargs (local stages off unless the scenario is about them)
+SCENARIOS = {
+    "sync": dict(concurrency=1, rule_threshold=None, dedup_threshold=None),
+    "async-8": dict(concurrency=8, rule_threshold=None, dedup_threshold=None),
+    "async-8+rules+dedup": dict(concurrency=8),
+}
+
+
+def make_workbook(path: str, rows: int, sheets: int = 2, dup_share: float = 0.3, seed: int = 7) -> None:
+    """Synthetic scraper output; dup_share of rows repeat an earlier post (cross-posts, quotes)."""
+    rnd = random.Random(seed)
+    per_sheet = max(1, rows // sheets)
+    with pd.ExcelWriter(path, engine="openpyxl") as w:
+        for s in range(sheets):
+            titles = []
+            for i in range(per_sheet):
+                if titles and rnd.random() < dup_share:
+                    titles.append(rnd.choice(titles))
+                else:
+                    titles.append(f"{rnd.choice(PRODUCTS)} {rnd.choice(ISSUES)} #{s}-{i}")
+            pd.DataFrame({
+                "Title": titles,
+                "FullText": [t + ". " + " ".join(rnd.choice(ISSUES) for _ in range(rnd.randint(1, 6))) for t in titles],
+                "AuthorName": [rnd.choice(AUTHORS) for _ in titles],
+                "RepliesCount": [rnd.choice([0, 1, 2, 5]) for _ in titles],
+            }).to_excel(w, sheet_name=f"SE{s}", index=False)
+
+
+def bench_pipeline(srv, path: str, kw: dict) -> dict:
+    srv.reset_stats()
+    t = time.perf_counter()
+    L.run_pipeline(path, cache_path=None, checkpoint=False, metrics=False, verbose=False,
+                   rpm=1_000_000, tpm=10 ** 9, **kw)
+    return {"seconds": time.perf_counter() - t, **srv.stats()}
+
+
+def bench_single_call(srv, rows: int, batch: int = 25) -> dict:
+    """classify_batch_json_mode_ai directly, fixed-size chunks, no sleep between calls."""
+    rnd = random.Random(11)
+    texts = [f"{rnd.choice(PRODUCTS)} {rnd.choice(ISSUES)} {i}" for i in range(rows)]
+    srv.reset_stats()
+    t = time.perf_counter()
+    for k in range(0, rows, batch):
+        L.classify_batch_json_mode_ai(texts[k:k + batch], sleep=0)
+    return {"seconds": time.perf_counter() - t, **srv.stats()}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[200, 1_000, 5_000])
+    ap.add_argument("--latency", type=float, default=0.3, help="fake server mean seconds per call")
+    ap.add_argument("--drop-rate", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    ap.add_argument("--json", help="also write the results here (for comparing runs)")
+    a = ap.parse_args()
+
+    srv = start_fake_server(latency=a.latency, drop_rate=a.drop_rate, error_rate=a.error_rate)
+    L.configure_client(base_url=srv.base_url, api_key="fake")
+
+    results = []
+    print(f"{'scenario':<27} | {'rows':>6} | {'rows/s':>8} | {'calls':>6} | {'items':>6} | {'tokens in/out':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in a.rows:
+            path = os.path.join(tmp, f"bench_{n}.xlsx")
+            make_workbook(path, n)
+            runs = [("classify_batch_json_mode_ai", lambda: bench_single_call(srv, n))]
+            runs += [(name, lambda kw=SCENARIOS[name]: bench_pipeline(srv, path, kw)) for name in a.scenarios]
+            for name, fn in runs:
+                r = fn()
+                r.update(scenario=name, rows=n, rows_per_s=n / r["seconds"])
+                results.append(r)
+                print(f"{name:<27} | {n:>6} | {r['rows_per_s']:>8,.0f} | {r['calls']:>6} | {r['items']:>6} | "
+                      f"{r['prompt_tokens']:>7}/{r['completion_tokens']:<7}")
+    srv.shutdown()
+
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f:
+            json.dump({"latency": a.latency, "drop_rate": a.drop_rate, "error_rate": a.error_rate,
+                       "results": results}, f, indent=2)
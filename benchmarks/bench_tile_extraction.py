@@ -0,0 +1,136 @@
+# =========================
+# Micro-benchmark: listing tile extraction in Chrome (per-field WebDriver calls vs one script call)
+# =========================
+# Needs Chrome (like scraper.py); no live site: a synthetic listing page built from the saved
+# fixture tiles is served by fake_community_server.py. Reports ms and WebDriver commands per page.
+#   python benchmarks/bench_tile_extraction.py --tiles 10 30 60 --repeat 5
+#   python benchmarks/bench_tile_extraction.py --no-browser    (commands per page only, no Chrome)
+
+from __future__ import annotations
+import os, sys, re, time, argparse, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lxml import html as lxml_html
+from selenium.webdriver.common.by import By
+import scraper as S
+from fake_community_server import start_fake_server, fixture_name, FIXTURES_DIR
+
+SOURCE_PAGE = "t5_community_ct-p_id-community_page1.html"
+TILE_RE = re.compile(r"\s*<article class=\"samsung-message-tile\">.*?</article>\n", re.S)
+
+
+def make_listing_page(fixtures_dir: str, n_tiles: int) -> str:
+    """Fixture listing page with n_tiles tiles (unique post links); -> its URL path."""
+    with open(os.path.join(FIXTURES_DIR, SOURCE_PAGE), encoding="utf-8") as f:
+        src = f.read()
+    tiles = TILE_RE.findall(src)
+    body = "".join(re.sub(r"/td-p/(\d+)", f"/td-p/\\g<1>{i:04d}", tiles[i % len(tiles)]) for i in range(n_tiles))
+    page = TILE_RE.sub("", src).replace("</section>", body + " </section>")
+    path = f"/t5/community/ct-p/bench?page={n_tiles}"
+    with open(os.path.join(fixtures_dir, fixture_name(path)), "w", encoding="utf-8") as f:
+        f.write(page)
+    return path
+
+
+def python_parsers(driver, sel: str) -> list:
+    seen, rows = set(), []
+    for t in driver.find_elements(By.CSS_SELECTOR, sel):
+        row = S.parse_listing_tile(t, 1, seen)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def js_script(driver, sel: str) -> list:
+    return S.rows_from_tile_items(S.extract_tiles_js(driver, sel), 1, set())
+
+
+def count_commands(driver) -> dict:
+    """Count WebDriver commands (one HTTP round trip to chromedriver each) sent through driver."""
+    counter, execute = {"n": 0}, driver.execute
+
+    def counted(*a, **kw):
+        counter["n"] += 1
+        return execute(*a, **kw)
+
+    driver.execute = counted  # WebElements send their commands through their driver too
+    return counter
+
+
+def bench(fn, driver, sel: str, repeat: int, counter: dict) -> tuple:
+    best, rows = float("inf"), None
+    for _ in range(repeat):
+        counter["n"] = 0
+        t = time.perf_counter()
+        rows = fn(driver, sel)
+        best = min(best, time.perf_counter() - t)
+    return best, counter["n"], rows
+
+
+class CountingElement(S.LxmlElement):
+    """LxmlElement that counts the WebDriver commands the same calls would cost in Chrome."""
+    def __init__(self, el, counter: dict):
+        super().__init__(el)
+        self.counter = counter
+
+    @property
+    def text(self) -> str:
+        self.counter["n"] += 1
+        return super().text
+
+    def get_attribute(self, name: str):
+        self.counter["n"] += 1
+        return super().get_attribute(name)
+
+    def find_elements(self, by, selector: str) -> list:
+        self.counter["n"] += 1
+        return [CountingElement(e, self.counter) for e in self.el.cssselect(selector)]
+
+    def find_element(self, by, selector: str):
+        self.counter["n"] += 1
+        return CountingElement(super().find_element(by, selector).el, self.counter)
+
+
+def commands_without_browser(fixtures_dir: str, paths: dict) -> None:
+    """Python-parser commands per page, replayed over the served HTML; the JS path is one execute_script."""
+    sel = "article.samsung-message-tile"
+    print(f"{'tiles':>6} | {'python cmds/page':>16} | {'js cmds/page':>12} | rows")
+    for n, path in paths.items():
+        with open(os.path.join(fixtures_dir, fixture_name(path)), encoding="utf-8") as f:
+            doc = lxml_html.fromstring(f.read())
+        counter = {"n": 1}  # driver.find_elements for the tiles
+        seen, rows = set(), 0
+        for t in doc.cssselect(sel):
+            rows += S.parse_listing_tile(CountingElement(t, counter), 1, seen) is not None
+        print(f"{n:>6} | {counter['n']:>16,} | {1:>12} | {rows}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tiles", type=int, nargs="+", default=[10, 30, 60])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--no-browser", action="store_true", help="only count WebDriver commands per page (no Chrome)")
+    a = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {n: make_listing_page(tmp, n) for n in a.tiles}
+        if a.no_browser:
+            commands_without_browser(tmp, paths)
+            sys.exit(0)
+        srv = start_fake_server(fixtures_dir=tmp)
+        driver = S.new_listing_driver(headless=True)
+        counter = count_commands(driver)
+        try:
+            print(f"{'tiles':>6} | {'python ms/page':>15} | {'js ms/page':>11} | speedup | "
+                  f"{'python cmds':>11} | {'js cmds':>7} | same rows")
+            for n, path in paths.items():
+                driver.get(srv.base_url + path)
+                sel = "article.samsung-message-tile"
+                before, cmds_py, rows_py = bench(python_parsers, driver, sel, a.repeat, counter)
+                after, cmds_js, rows_js = bench(js_script, driver, sel, a.repeat, counter)
+                print(f"{n:>6} | {before * 1000:>15,.1f} | {after * 1000:>11,.1f} | {before / after:6.1f}x | "
+                      f"{cmds_py:>11,} | {cmds_js:>7} | {rows_py == rows_js}")
+        finally:
+            driver.quit()
+            srv.shutdown()
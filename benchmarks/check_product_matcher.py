@@ -0,0 +1,28 @@
+# =========================
+# Check: product spellings seen on the forum -> category (ProductMatcher / assign_category)
+# =========================
+# Run after editing CANON or the matcher's boundary rules; exits non-zero on any mismatch.
+#   python benchmarks/check_product_matcher.py
+
+from __future__ import annotations
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llmclassifier as L
+
+SPELLINGS = {
+    "Galaxy Buds2 Pro": "Galaxy Buds", "Galaxy Buds3 Pro": "Galaxy Buds", "Galaxy Buds Pro": "Galaxy Buds",
+    "Galaxy Watch Active2": "Galaxy Watch", "Galaxy Watch4 Classic": "Galaxy Watch",
+    "Galaxy Z Fold5": "Galaxy Z Fold", "Galaxy A25 5G": "Galaxy A", "Galaxy A05s": "Galaxy A",
+    "Galaxy S24FE": "Galaxy S", "Galaxy Tab S9 FE": "Galaxy Tab S",
+    "my galaxy a255": "Others",  # "Galaxy A25" must not fire inside a longer model number
+}
+
+
+if __name__ == "__main__":
+    bad = {k: (L.assign_category(k), want) for k, want in SPELLINGS.items() if L.assign_category(k) != want}
+    for k, (got, want) in bad.items():
+        print(f"× {k!r}: {got} (expected {want})")
+    print(f"{len(SPELLINGS) - len(bad)}/{len(SPELLINGS)} spellings OK")
+    sys.exit(1 if bad else 0)
@@ -0,0 +1,168 @@
+# =========================
+# Fake Samsung Members community server (local scraper testing, no live site)
+# =========================
+# Serves saved HTML pages from fixtures/community/ under their original paths, so the HTTP
+# fetchers in scraper.py can run against it instead of r1.community.samsung.com:
+#   GET /t5/galaxy-s/some-title/td-p/1001        -> t5_galaxy-s_some-title_td-p_1001.html
+#   GET /t5/community/ct-p/id-community?page=3   -> t5_community_ct-p_id-community_page3.html
+#   GET /stats                                   (requests, errors, peak in-flight; POST /stats/reset)
+#
+# Usage:
+#   python fake_community_server.py --port 8766 --latency 0.3 --error-rate 0.05
+#   python fake_community_server.py --record https://r1.community.samsung.com/t5/...   (save a live page)
+
+from __future__ import annotations
+import os, re, json, time, random, argparse, threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "community")
+
+
+def fixture_name(path_qs: str) -> str:
+    """URL path (+ ?page=N) -> fixture file name."""
+    parts = urlsplit(path_qs)
+    name = re.sub(r"[^A-Za-z0-9.-]+", "_", parts.path.strip("/")) or "index"
+    page = parse_qs(parts.query).get("page")
+    if page:
+        name += f"_page{page[0]}"
+    return name + ".html"
+
+
+class FakeCommunityHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+
+    def log_message(self, fmt, *args):  # quiet
+        pass
+
+    def _send(self, status: int, body: bytes, ctype: str = "text/html; charset=utf-8", headers: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        srv, cfg = self.server, self.server.cfg
+        if self.path.split("?")[0].rstrip("/") == "/stats":
+            self._send(200, json.dumps(srv.stats()).encode(), "application/json")
+            return
+        srv.enter()
+        try:
+            if cfg["latency"]:
+                time.sleep(cfg["latency"] * random.uniform(0.5, 1.5))
+            if random.random() < cfg["rate_limit_rate"]:
+                srv.count("rate_limited")
+                self._send(429, b"Too Many Requests", headers={"Retry-After": str(cfg["retry_after"])})
+                return
+            if random.random() < cfg["error_rate"]:
+                srv.count("errors")
+                self._send(503, b"Service Unavailable (fake)")
+                return
+            path = os.path.join(srv.fixtures_dir, fixture_name(self.path))
+            if not os.path.isfile(path):
+                srv.count("not_found")
+                self._send(404, b"Not Found")
+                return
+            with open(path, "rb") as f:
+                self._send(200, f.read())
+        finally:
+            srv.leave()
+
+    def do_POST(self):
+        if self.path.split("?")[0].rstrip("/") == "/stats/reset":
+            self.server.reset_stats()
+            self._send(200, json.dumps(self.server.stats()).encode(), "application/json")
+            return
+        self._send(404, b"Not Found")
+
+
+class FakeCommunityServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, fixtures_dir: str = FIXTURES_DIR, latency=0.0, error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=1.0):
+        super().__init__(addr, FakeCommunityHandler)
+        self.fixtures_dir = fixtures_dir
+        self.cfg = {"latency": latency, "error_rate": error_rate, "rate_limit_rate": rate_limit_rate,
+                    "retry_after": retry_after}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # ---- stats ----
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"requests": 0, "rate_limited": 0, "errors": 0, "not_found": 0, "peak_in_flight": 0}
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def enter(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+    def leave(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+def start_fake_server(host: str = "127.0.0.1", port: int = 0, **cfg) -> FakeCommunityServer:
+    """Start the server on a background thread (port=0 -> pick a free port). Call .shutdown() when done."""
+    srv = FakeCommunityServer((host, port), **cfg)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def record(urls, fixtures_dir: str = FIXTURES_DIR) -> None:
+    """Save live pages as fixtures (the served HTML, no JavaScript run)."""
+    import scraper as S
+    os.makedirs(fixtures_dir, exist_ok=True)
+    with S.new_http_client() as client:
+        for url in urls:
+            r = client.get(url)
+            r.raise_for_status()
+            parts = urlsplit(url)
+            path = os.path.join(fixtures_dir, fixture_name(parts.path + ("?" + parts.query if parts.query else "")))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(r.text)
+            print(f"saved {url} -> {path}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fake Samsung Members community server (saved HTML fixtures)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of saved pages")
+    ap.add_argument("--latency", type=float, default=0.0, help="mean seconds per page")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of pages answered with 503")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of pages answered with 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    ap.add_argument("--record", nargs="+", metavar="URL", help="save these live pages into --fixtures and exit")
+    a = ap.parse_args()
+
+    if a.record:
+        record(a.record, a.fixtures)
+    else:
+        srv = FakeCommunityServer((a.host, a.port), fixtures_dir=a.fixtures, latency=a.latency,
+                                  error_rate=a.error_rate, rate_limit_rate=a.rate_limit_rate,
+                                  retry_after=a.retry_after)
+        print(f"🧪 Fake community server on {srv.base_url} (fixtures: {a.fixtures})")
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,266 @@
+# =========================
+# Fake OpenAI chat-completions server (local testing, no API spend)
+# =========================
+# Speaks just enough of the OpenAI REST API for llmclassifier.py:
+#   POST /v1/chat/completions   (JSON mode, answers with {"items": [...]})
+#   POST /v1/files, GET /v1/files/{id}/content, POST /v1/batches, GET /v1/batches/{id}
+#        (Batch API: jobs run on a background thread, --batch-delay seconds per job)
+#   GET  /stats                  (calls, errors, items, tokens served so far; POST /stats/reset)
+#
+# Usage:
+#   python fake_openai_server.py --port 8765 --latency 0.5 --rate-limit-rate 0.05 --error-rate 0.01 --drop-rate 0.02
+#   set OPENAI_BASE_URL=http://127.0.0.1:8765/v1  and  OPENAI_API_KEY=fake
+#   python llmclassifier.py
+
+from __future__ import annotations
+import re, json, time, uuid, random, argparse, threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LINE_RE = re.compile(r"(?m)^\[(\d+)\] (.*)")
+PRODUCT_RE = re.compile(r"\bGalaxy\s+(?:Z\s+)?[A-Za-z]+\s?\d*\b", re.I)
+
+# Keyword -> subtopic, first hit wins (deterministic, good enough for throughput tests)
+SUBTOPIC_HINTS = [
+    ("contest", "Contest"), ("promo", "Promo"), ("battery", "Battery / Charging"),
+    ("charg", "Battery / Charging"), ("camera", "Camera"), ("screen", "Screen / Display"),
+    ("update", "Software"), ("wifi", "Connectivity / Network"), ("price", "Price / Purchase Inquiry"),
+]
+TOPIC_OF = {
+    "Contest": "Contest", "Promo": "Promo", "Price / Purchase Inquiry": "Purchase & Orders",
+    "Battery / Charging": "Product (Support)", "Camera": "Product (Support)",
+    "Screen / Display": "Product (Support)", "Software": "Product (Support)",
+    "Connectivity / Network": "Product (Support)", "Others": "Others",
+}
+
+
+def fake_label(i: int, text: str) -> dict:
+    low = text.lower()
+    subtopic = next((sub for key, sub in SUBTOPIC_HINTS if key in low), "Others")
+    m = PRODUCT_RE.search(text)
+    product = m.group(0).strip() if m else "No specific product"
+    return {
+        "i": i,
+        "ss_product": product,
+        "product_category": "Others",
+        "subtopic": subtopic,
+        "topic": TOPIC_OF.get(subtopic, "Others"),
+        "sentiment": "Negative" if any(k in low for k in ("not", "error", "issue", "problem")) else "Neutral",
+        "brand_terms": [product] if m else [],
+    }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, fmt, *args):  # quiet
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}")
+
+    def _send_bytes(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_multipart(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode() + self.rfile.read(n)
+        msg = BytesParser().parsebytes(raw)
+        return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                for part in msg.get_payload()}
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/stats"):
+            self._send_json(200, self.server.stats())
+            return
+        m = re.search(r"/files/([^/]+)/content$", path)
+        if m and m.group(1) in self.server.files:
+            self._send_bytes(200, self.server.files[m.group(1)]["data"])
+            return
+        m = re.search(r"/batches/([^/]+)$", path)
+        if m and m.group(1) in self.server.batches:
+            self._send_json(200, self.server.batches[m.group(1)])
+            return
+        self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        cfg = self.server.cfg
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/stats/reset"):
+            self.server.reset_stats()
+            self._send_json(200, self.server.stats())
+            return
+        if path.endswith("/files"):
+            form = self._read_multipart()
+            self._send_json(200, self.server.add_file(form.get("file") or b"",
+                                                     (form.get("purpose") or b"batch").decode()))
+            return
+        if path.endswith("/batches"):
+            self._send_json(200, self.server.create_batch(self._read_json()))
+            return
+        if path.endswith("/chat/completions"):
+            req = self._read_json()
+            if cfg["latency"]:
+                time.sleep(cfg["latency"] * random.uniform(0.5, 1.5))
+            if random.random() < cfg["rate_limit_rate"]:
+                self.server.count("rate_limited")
+                self._send_json(429, {"error": {"message": "Rate limit reached (fake)", "type": "requests",
+                                                "code": "rate_limit_exceeded"}},
+                                headers={"retry-after": str(cfg["retry_after"])})
+                return
+            if random.random() < cfg["error_rate"]:
+                self.server.count("errors")
+                self._send_json(500, {"error": {"message": "Internal error (fake)", "type": "server_error"}})
+                return
+            self._send_json(200, self.server.complete(req))
+            return
+        self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, latency=0.0, rate_limit_rate=0.0, retry_after=1.0, batch_delay=0.5,
+                 error_rate=0.0, drop_rate=0.0, usage_scale=1.0):
+        super().__init__(addr, FakeOpenAIHandler)
+        self.cfg = {"latency": latency, "rate_limit_rate": rate_limit_rate, "retry_after": retry_after,
+                    "batch_delay": batch_delay, "error_rate": error_rate, "drop_rate": drop_rate,
+                    "usage_scale": usage_scale}
+        self._lock = threading.Lock()
+        self._n = 0
+        self.reset_stats()
+        self.files = {}    # id -> {"data": bytes, ...FileObject fields}
+        self.batches = {}  # id -> Batch object (dict)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    # ---- stats ----
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"calls": 0, "rate_limited": 0, "errors": 0, "items": 0, "items_dropped": 0,
+                           "prompt_tokens": 0, "completion_tokens": 0}
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def complete(self, req: dict) -> dict:
+        msgs = req.get("messages") or []
+        user = next((m.get("content", "") for m in reversed(msgs) if m.get("role") == "user"), "")
+        system = next((m.get("content", "") for m in msgs if m.get("role") == "system"), "")
+        asked = LINE_RE.findall(user)
+        items = [fake_label(int(i), t) for i, t in asked if random.random() >= self.cfg["drop_rate"]]
+        content = json.dumps({"items": items})
+
+        prompt_tokens = int((len(system) + len(user)) / 4 * self.cfg["usage_scale"])
+        completion_tokens = int(len(content) / 4 * self.cfg["usage_scale"])
+        with self._lock:
+            self._n += 1
+            n = self._n
+            st = self._stats
+            st["calls"] += 1
+            st["items"] += len(asked)
+            st["items_dropped"] += len(asked) - len(items)
+            st["prompt_tokens"] += prompt_tokens
+            st["completion_tokens"] += completion_tokens
+        return {
+            "id": f"chatcmpl-fake-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+
+    # ---- Batch API ----
+    def add_file(self, data: bytes, purpose: str) -> dict:
+        fid = f"file-{uuid.uuid4().hex[:24]}"
+        meta = {"id": fid, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": f"{fid}.jsonl", "purpose": purpose, "status": "processed"}
+        self.files[fid] = {"data": data, **meta}
+        return meta
+
+    def create_batch(self, req: dict) -> dict:
+        bid = f"batch_{uuid.uuid4().hex[:24]}"
+        job = {"id": bid, "object": "batch", "endpoint": req.get("endpoint", "/v1/chat/completions"),
+               "input_file_id": req.get("input_file_id"), "completion_window": req.get("completion_window", "24h"),
+               "status": "validating", "created_at": int(time.time()), "output_file_id": None,
+               "error_file_id": None, "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+        self.batches[bid] = job
+        threading.Thread(target=self._run_batch, args=(bid,), daemon=True).start()
+        return dict(job)
+
+    def _run_batch(self, bid: str):
+        job = self.batches[bid]
+        src = self.files.get(job["input_file_id"])
+        if src is None:
+            job.update(status="failed", failed_at=int(time.time()))
+            return
+        lines = [json.loads(l) for l in src["data"].decode("utf-8").splitlines() if l.strip()]
+        job.update(status="in_progress", in_progress_at=int(time.time()))
+        job["request_counts"]["total"] = len(lines)
+        time.sleep(self.cfg["batch_delay"])
+        out = []
+        for rec in lines:
+            out.append(json.dumps({"id": f"batch_req_{uuid.uuid4().hex[:16]}", "custom_id": rec["custom_id"],
+                                   "response": {"status_code": 200, "body": self.complete(rec["body"])},
+                                   "error": None}))
+            job["request_counts"]["completed"] += 1
+        job.update(output_file_id=self.add_file(("\n".join(out) + "\n").encode("utf-8"), "batch_output")["id"],
+                   status="completed", completed_at=int(time.time()))
+
+
+def start_fake_server(host: str = "127.0.0.1", port: int = 0, **cfg) -> FakeOpenAIServer:
+    """Start the server on a background thread (port=0 -> pick a free port). Call .shutdown() when done."""
+    srv = FakeOpenAIServer((host, port), **cfg)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fake OpenAI chat-completions / Batch API server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="mean seconds per completion")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds sent with 429s")
+    ap.add_argument("--batch-delay", type=float, default=0.5, help="seconds a Batch API job stays in_progress")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 500")
+    ap.add_argument("--drop-rate", type=float, default=0.0, help="fraction of items left out of the reply")
+    ap.add_argument("--usage-scale", type=float, default=1.0, help="multiplier for the reported token usage")
+    a = ap.parse_args()
+
+    srv = FakeOpenAIServer((a.host, a.port), latency=a.latency, rate_limit_rate=a.rate_limit_rate,
+                           retry_after=a.retry_after, batch_delay=a.batch_delay, error_rate=a.error_rate,
+                           drop_rate=a.drop_rate, usage_scale=a.usage_scale)
+    print(f"🧪 Fake OpenAI server on {srv.base_url}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -5,11 +5,38 @@
 # Ensure OPENAI_API_KEY is set in environment.
 
 from __future__ import annotations
-import os, re, json, time, unicodedata
+import os, re, json, math, time, zlib, pickle, random, difflib, asyncio, sqlite3, hashlib, weakref, threading, unicodedata
+from collections import defaultdict, deque
+from functools import lru_cache, partial
+import numpy as np
 import pandas as pd
-from openai import OpenAI
+import openpyxl
+from openai import OpenAI, AsyncOpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
 
-client = OpenAI()  # uses OPENAI_API_KEY
+# Clients are created on first use (importing this module needs no key / network);
+# configure_client() points them elsewhere, e.g. at fake_openai_server.py for benchmarks.
+_client = None
+_client_kw = {}
+
+def configure_client(**kw) -> None:
+    """kw (base_url, api_key, timeout, ...) are passed to OpenAI() / AsyncOpenAI() from now on."""
+    global _client, _client_kw
+    _client, _client_kw = None, dict(kw)
+
+def get_client() -> OpenAI:
+    global _client
+    if _client is None:
+        _client = OpenAI(**_client_kw)  # defaults: OPENAI_API_KEY / OPENAI_BASE_URL
+    return _client
+
+def _async_client() -> AsyncOpenAI:
+    # our own retry loop handles 429s, so disable the SDK's built-in retries
+    return AsyncOpenAI(**{**_client_kw, "max_retries": 0})
+
+def __getattr__(name):
+    if name == "client":  # old scripts use llmclassifier.client directly
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ========= 1) CONFIG =========
 MODEL = "gpt-4.1-mini"
@@ -28,6 +55,7 @@ STAR_CANON = {
     "SummeRamirez","MarkLuceño","LiezlNierves"
 }
 
+@lru_cache(maxsize=65536)
 def _norm_name(s: str) -> str:
     """Normalize usernames: lowercase, remove accents, trim punctuation, collapse spaces."""
     if s is None:
@@ -118,15 +146,99 @@ def build_category_map(products):
 
 CATEGORY_MAP = build_category_map(CANON)
 
+class ProductMatcher:
+    """
+    Aho-Corasick automaton over product names: one case-insensitive pass finds every mention.
+    Matches must sit on word boundaries ("Galaxy A2" never fires inside "Galaxy A25"), except that a
+    name ending in a digit may be followed by a letter suffix ("Galaxy A05s", "Galaxy S24FE") and a
+    name ending in a letter by a generation number ("Galaxy Buds2 Pro", "Galaxy Watch Active2").
+    A space between a word and a number is optional on both sides ("Galaxy Watch4" = "Galaxy Watch 4").
+    Overlaps resolve leftmost-longest ("NEO QLED" beats "QLED", "Galaxy Buds Pro" beats "Galaxy Buds").
+    """
+    def __init__(self, names):
+        self._goto, self._fail, self._out = [{}], [0], [[]]
+        for name in names:
+            key = self._norm(name)
+            node = 0
+            for ch in key:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(key), name))
+
+        # BFS: failure links + inherited outputs
+        q = deque(self._goto[0].values())
+        while q:
+            r = q.popleft()
+            for ch, nxt in self._goto[r].items():
+                q.append(nxt)
+                f = self._fail[r]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    @staticmethod
+    def _norm(s) -> str:
+        return re.sub(r"(?<=[a-z]) (?=\d)", "", re.sub(r"\s+", " ", str(s).lower()))
+
+    def _matches(self, text) -> list:
+        """Non-overlapping leftmost-longest matches -> [(start, end, name)] in text order."""
+        s = self._norm(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        found, node = [], 0
+        for end, ch in enumerate(s, start=1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for n, name in out[node]:
+                start = end - n
+                if start > 0 and s[start - 1].isalnum():
+                    continue
+                if end < len(s) and s[end].isalnum() and s[end - 1].isdigit() == s[end].isdigit():
+                    continue
+                found.append((start, end, name))
+
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        picked, last_end = [], 0
+        for m in found:
+            if m[0] >= last_end:
+                picked.append(m)
+                last_end = m[1]
+        return picked
+
+    def find_all(self, text) -> list:
+        """Every product mentioned, in order of first appearance (deduplicated)."""
+        return list(dict.fromkeys(name for _, _, name in self._matches(text)))
+
+    def longest(self, text) -> str | None:
+        """The most specific (longest) product mentioned; ties go to the earliest mention."""
+        best = None
+        for start, end, name in self._matches(text):
+            if best is None or end - start > best[1] - best[0]:
+                best = (start, end, name)
+        return best[2] if best else None
+
+PRODUCT_MATCHER = ProductMatcher(CANON)
+
+def extract_products(text) -> list:
+    """All CANON products mentioned in a post (local brand_terms source)."""
+    return PRODUCT_MATCHER.find_all(text) if text else []
+
+@lru_cache(maxsize=8192)
 def assign_category(product_name: str) -> str:
     if not product_name:
         return "Others"
     if product_name in CATEGORY_MAP:
         return CATEGORY_MAP[product_name]
-    for known, cat in CATEGORY_MAP.items():
-        if known.lower() in product_name.lower():
-            return cat
-    return "Others"
+    hit = PRODUCT_MATCHER.longest(product_name)
+    return CATEGORY_MAP[hit] if hit else "Others"
+
 
 
 # ========= 2) AI Prompt (Subtopics + Topic mapping) =========
@@ -137,13 +249,34 @@ SUBTOPICS = [
   "Performance","Connectivity / Network","Audio / Calls","Storage / Memory","Design","Apps","Others"
 ]
 
+# Same mapping as the prompt below ("Others" is ambiguous: Product (General) or Others).
+# Product subtopics map to "Product (Support)", except reviews / impressions without help-seeking
+# cues, which the prompt files under "Product (General)" (GENERAL_TOPIC_SUBTOPICS).
+PRODUCT_SUBTOPICS = [
+    "Warranty", "Accessories", "Software", "Camera", "Screen / Display", "AI", "Battery / Charging",
+    "Account", "Performance", "Connectivity / Network", "Audio / Calls", "Storage / Memory", "Design", "Apps"]
+SUBTOPIC_TOPIC = {
+    "Contest": "Contest", "Events": "News", "Information": "News", "Competitor": "Competitor",
+    "Promo": "Promo", "Price / Purchase Inquiry": "Purchase & Orders", "Recommendation": "Purchase & Orders",
+    "Shipping": "Purchase & Orders", "Agent": "Service",
+    **{s: "Product (Support)" for s in PRODUCT_SUBTOPICS},
+}
+GENERAL_TOPIC_SUBTOPICS = {*PRODUCT_SUBTOPICS, "Others"}
+
+TOPICS = ["Contest", "News", "Competitor", "Promo", "Purchase & Orders", "Service",
+          "Product (Support)", "Product (General)", "Others"]
+SENTIMENTS = ["Positive", "Negative", "Neutral", "Mix"]
+PRODUCT_CATEGORIES = ["Galaxy S", "Galaxy Z Flip", "Galaxy Z Fold", "Galaxy Tab S", "Galaxy Tab A", "Galaxy A",
+                      "Galaxy M", "Galaxy Watch", "Galaxy Buds", "Monitor", "Soundbar", "Refrigerator", "Laundry",
+                      "Air Conditioner", "Vacuum Cleaner", "Microwave", "Others"]
+
 PROMPT_GUIDE = f"""
 You are an expert annotator of Samsung Members / Samsung Community forum posts.
 Return ONLY a valid JSON object with key "items" = array of results.
 Each array element MUST be an object with keys:
 - i: integer index of the input line
 - ss_product: most specific Samsung product model discussed (e.g. "Galaxy S24 Ultra"). If none, "No specific product".
-- product_category: one of ["Galaxy S","Galaxy Z Flip","Galaxy Z Fold","Galaxy Tab S","Galaxy Tab A","Galaxy A","Galaxy M","Galaxy Watch","Galaxy Buds","Monitor","Soundbar","Refrigerator","Laundry","Air Conditioner","Vacuum Cleaner","Microwave","Others"]
+- product_category: one of {json.dumps(PRODUCT_CATEGORIES, separators=(",", ":"))}
 - subtopic: choose EXACTLY one from: {SUBTOPICS}
 - topic: choose based on subtopic (EXACT strings):
   * Contest -> "Contest"
@@ -159,7 +292,7 @@ Each array element MUST be an object with keys:
     ("how to","please help","need help","need advice","seek support","bug","fix","error code","is it possible")
     -> "Product (General)"
   * Otherwise -> "Others"
-- sentiment: one of ["Positive","Negative","Neutral","Mix"]
+- sentiment: one of {json.dumps(SENTIMENTS, separators=(",", ":"))}
   * Neutral = factual/informative/acknowledgment only
   * Mix = clear positive AND negative cues (esp. with connectors "but","however","though","although","yet","nevertheless","still")
 - brand_terms: array of Samsung products/families/categories mentioned (deduplicate; keep specificity)
@@ -172,26 +305,123 @@ Guardrails:
 """.strip()
 
 
+# ========= 2b) Label validation / local repair =========
+# Near misses the model produces ("Mixed", "Battery/Charging", "Product Support") map onto the
+# canonical enums without another API call; anything unresolvable is re-asked (REPAIR_MAX_ROUNDS).
+LABEL_FUZZY_CUTOFF = 0.8    # difflib ratio on normalized strings
+REPAIR_MAX_ROUNDS = 2       # follow-up requests per batch for dropped / invalid items
+
+LABEL_ENUMS = {"subtopic": SUBTOPICS, "topic": TOPICS, "sentiment": SENTIMENTS,
+               "product_category": PRODUCT_CATEGORIES}
+LABEL_ALIASES = {
+    "sentiment": {"mixed": "Mix", "pos": "Positive", "neg": "Negative", "neu": "Neutral"},
+    "topic": {"purchase": "Purchase & Orders", "orders": "Purchase & Orders", "support": "Product (Support)",
+              "general": "Product (General)", "promotion": "Promo", "other": "Others"},
+    "subtopic": {"battery": "Battery / Charging", "charging": "Battery / Charging", "screen": "Screen / Display",
+                 "display": "Screen / Display", "connectivity": "Connectivity / Network", "network": "Connectivity / Network",
+                 "wifi": "Connectivity / Network", "bluetooth": "Connectivity / Network", "audio": "Audio / Calls",
+                 "calls": "Audio / Calls", "storage": "Storage / Memory", "memory": "Storage / Memory",
+                 "price": "Price / Purchase Inquiry", "purchase inquiry": "Price / Purchase Inquiry",
+                 "promotion": "Promo", "event": "Events", "galaxy ai": "AI", "app": "Apps", "other": "Others"},
+    "product_category": {"galaxy flip": "Galaxy Z Flip", "z flip": "Galaxy Z Flip", "galaxy fold": "Galaxy Z Fold",
+                         "z fold": "Galaxy Z Fold", "watch": "Galaxy Watch", "buds": "Galaxy Buds",
+                         "washing machine": "Laundry", "washer": "Laundry", "fridge": "Refrigerator",
+                         "aircon": "Air Conditioner", "vacuum": "Vacuum Cleaner", "other": "Others"},
+}
+
+def _label_key(s) -> str:
+    s = unicodedata.normalize("NFKC", str(s)).casefold().replace("&", " and ")
+    return re.sub(r"[^0-9a-z]+", " ", s).strip()
+
+_LABEL_INDEX = {
+    field: {**{_label_key(v): v for v in allowed},
+            **{_label_key(a): c for a, c in LABEL_ALIASES.get(field, {}).items()}}
+    for field, allowed in LABEL_ENUMS.items()
+}
+
+@lru_cache(maxsize=4096)
+def canonical_label(field: str, value) -> str | None:
+    """Exact enum value, or its case/spacing/alias/close-spelling match; None if nothing is close."""
+    if value in LABEL_ENUMS[field]:
+        return value
+    key, index = _label_key(value), _LABEL_INDEX[field]
+    if not key:
+        return None
+    if key in index:
+        return index[key]
+    hit = difflib.get_close_matches(key, index, n=1, cutoff=LABEL_FUZZY_CUTOFF)
+    return index[hit[0]] if hit else None
+
+def repair_row(row: dict) -> dict:
+    """
+    Snap a parsed label row onto the allowed enums (in place) and set row["label_status"]:
+    "ok" (valid as returned), "repaired" (fixed locally) or "invalid" (a field had no close match
+    and holds its default; worth re-asking). Values already in the enums are kept as returned; a topic
+    with no close match is derived from subtopic where the mapping is fixed.
+    """
+    default, status = _default_row(), "ok"
+
+    def fixed(field, value):
+        nonlocal status
+        row[field] = value
+        if status == "ok":
+            status = "repaired"
+
+    if not row.get("ss_product"):
+        fixed("ss_product", default["ss_product"])
+    for field in ("subtopic", "sentiment"):
+        c = canonical_label(field, row.get(field))
+        if c is None:
+            row[field], status = default[field], "invalid"
+        elif c != row.get(field):
+            fixed(field, c)
+
+    c = canonical_label("product_category", row.get("product_category"))
+    if c != row.get("product_category"):
+        fixed("product_category", c or default["product_category"])  # never worth a re-query
+
+    c = canonical_label("topic", row.get("topic"))
+    if c is None and status != "invalid":
+        c = SUBTOPIC_TOPIC.get(row["subtopic"])
+    if c is None:
+        row["topic"], status = default["topic"], "invalid"
+    elif c != row.get("topic"):
+        fixed("topic", c)
+
+    row["label_status"] = status
+    return row
+
+
 # ========= 3) Classify a batch in JSON mode =========
 def _clip(s, max_len=1000):
     s = "" if s is None else str(s)
     return s if len(s) <= max_len else s[:max_len]
 
-def classify_batch_json_mode_ai(texts, model=MODEL, sleep=0.3):
+def _default_row() -> dict:
+    return {
+        "ss_product": "No specific product",
+        "product_category": "Others",
+        "sentiment": "Neutral",
+        "topic": "Others",
+        "subtopic": "Others",
+        "brand_terms": []
+    }
+
+def _build_messages(texts) -> list:
     numbered = "\n\n".join([f"[{i}] {_clip(t)}" for i, t in enumerate(texts)])
-    chat = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": PROMPT_GUIDE},
-            {"role": "user", "content": f"Classify these lines and return JSON with key 'items'. Align using 'i':\n\n{numbered}"},
-        ],
-        response_format={"type": "json_object"},
-        temperature=0
-    )
+    return [
+        {"role": "system", "content": PROMPT_GUIDE},
+        {"role": "user", "content": f"Classify these lines and return JSON with key 'items'. Align using 'i':\n\n{numbered}"},
+    ]
 
+def _parse_items(content: str | None) -> dict:
+    """
+    Parse the model's JSON reply into {i: normalized label row} (see repair_row).
+    Unparseable items are skipped; rows with out-of-range labels come back with label_status "invalid".
+    """
     items = []
     try:
-        data = json.loads(chat.choices[0].message.content)
+        data = json.loads(content)
         items = data.get("items", [])
     except Exception:
         items = []
@@ -211,39 +441,1228 @@ def classify_batch_json_mode_ai(texts, model=MODEL, sleep=0.3):
         if not isinstance(brand_terms, list):
             brand_terms = []
 
-        by_i[i] = {
+        by_i[i] = repair_row({
             "ss_product": ss_prod,
             "product_category": cat_det,
             "sentiment": str(it.get("sentiment", "Neutral")).strip(),
             "topic": str(it.get("topic", "Others")).strip(),
             "subtopic": str(it.get("subtopic", "Others")).strip(),
             "brand_terms": brand_terms,
-        }
+        })
+    return by_i
+
+def _needs_requery(by_i, n: int) -> list:
+    return [j for j in range(n) if j not in by_i or by_i[j].get("label_status") == "invalid"]
+
+def _merge_requery(by_i, missing, got) -> None:
+    """Fold a follow-up reply (indexed 0..len(missing)-1) back into by_i; still-invalid items stay as they were."""
+    for k, r in got.items():
+        if 0 <= k < len(missing) and r.get("label_status") != "invalid":
+            by_i[missing[k]] = {**r, "label_status": "requeried"}
+        elif 0 <= k < len(missing) and missing[k] not in by_i:
+            by_i[missing[k]] = r
+
+def _request_with_repair(texts, request) -> dict:
+    """request(texts) -> by_i, then re-ask only for dropped / invalid items, at most REPAIR_MAX_ROUNDS times."""
+    by_i = request(texts)
+    for _ in range(REPAIR_MAX_ROUNDS):
+        missing = _needs_requery(by_i, len(texts))
+        if not missing:
+            break
+        _merge_requery(by_i, missing, request([texts[j] for j in missing]))
+    return by_i
+
+def _usage(chat) -> dict:
+    u = getattr(chat, "usage", None)
+    return {"prompt_tokens": getattr(u, "prompt_tokens", None) or 0,
+            "completion_tokens": getattr(u, "completion_tokens", None) or 0}
+
+def _status_counts(rows) -> dict:
+    """label_status tallies for a batch's metrics record."""
+    out = {"repaired": 0, "requeried": 0, "defaulted": 0}
+    for r in rows:
+        st = r.get("label_status")
+        key = "defaulted" if st in ("default", "invalid") else st
+        if key in out:
+            out[key] += 1
+    return out
+
+def _record_call(info, t0: float, chat, retries: int | None = None) -> None:
+    """
+    Add one API call's latency / retries / usage to a per-batch metrics dict (follow-ups accumulate).
+    retries=None (sync path: the SDK retries internally, unseen) leaves the field out.
+    """
+    if info is None:
+        return
+    fields = {"latency_s": time.perf_counter() - t0, "calls": 1, **_usage(chat)}
+    if retries is not None:
+        fields["retries"] = retries
+    for k, v in fields.items():
+        info[k] = info.get(k, 0) + v
+    info["latency_s"] = round(info["latency_s"], 3)
+
+def _request_batch(texts, model=MODEL, metrics=None) -> dict:
+    """One synchronous chat completion -> {i: row} for the items the model actually returned."""
+    t = time.perf_counter()
+    chat = get_client().chat.completions.create(
+        model=model,
+        messages=_build_messages(texts),
+        response_format={"type": "json_object"},
+        temperature=0
+    )
+    _record_call(metrics, t, chat)
+    return _parse_items(chat.choices[0].message.content)
+
+def _split_returned(idxs, by_i):
+    """
+    Map a batch reply back onto row indices -> (rows, returned flags). Dropped items get defaults
+    (label_status "default"); returned[k] is False for those and for still-invalid rows.
+    """
+    rows = [by_i.get(j) or {**_default_row(), "label_status": "default"} for j in range(len(idxs))]
+    returned = [j in by_i and by_i[j].get("label_status") != "invalid" for j in range(len(idxs))]
+    return rows, returned
 
-    out = []
-    for i in range(len(texts)):
-        out.append(by_i.get(i, {
-            "ss_product": "No specific product",
-            "product_category": "Others",
-            "sentiment": "Neutral",
-            "topic": "Others",
-            "subtopic": "Others",
-            "brand_terms": []
-        }))
+def classify_batch_json_mode_ai(texts, model=MODEL, sleep=0.3):
+    by_i = _request_with_repair(texts, lambda sub: _request_batch(sub, model=model))
+    out, _ = _split_returned(range(len(texts)), by_i)
 
     if sleep:
         time.sleep(sleep)
     return out
 
 
+# ========= 3b) Token-budget batching =========
+# One chat completion per sheet does not scale: big sheets overflow the context window
+# or come back with dropped indices. Pack rows into request-sized batches instead.
+BATCH_MAX_TOKENS = 8000   # estimated input tokens per request (excl. PROMPT_GUIDE)
+BATCH_MAX_ITEMS  = 25     # caps the JSON the model has to write back per request
+
+def estimate_tokens(text) -> int:
+    """Cheap token estimate without a tokenizer: ~4 chars/token for ASCII, ~2 for other scripts."""
+    s = _clip(text)
+    n_ascii = sum(1 for ch in s if ord(ch) < 128)
+    return math.ceil(n_ascii / 4 + (len(s) - n_ascii) / 2) + 4  # +4 for "[i] " and separators
+
+def pack_batches(texts, max_tokens: int = BATCH_MAX_TOKENS, max_items: int = BATCH_MAX_ITEMS) -> list:
+    """
+    Greedily split row indices into consecutive batches bounded by estimated tokens and item count.
+    A single row larger than max_tokens still gets its own batch.
+    Returns: list of lists of row indices (row order preserved).
+    """
+    batches, cur, cur_tok = [], [], 0
+    for i, t in enumerate(texts):
+        tok = estimate_tokens(t)
+        if cur and (cur_tok + tok > max_tokens or len(cur) >= max_items):
+            batches.append(cur)
+            cur, cur_tok = [], 0
+        cur.append(i)
+        cur_tok += tok
+    if cur:
+        batches.append(cur)
+    return batches
+
+def classify_in_batches(texts, model=MODEL,
+                        max_tokens: int = BATCH_MAX_TOKENS,
+                        max_items: int = BATCH_MAX_ITEMS,
+                        concurrency: int = 1,
+                        limiter: RateLimiter | None = None,
+                        on_batch=None,
+                        metrics: MetricsRecorder | None = None,
+                        sleep: float = 0.3,
+                        verbose: bool = False) -> list:
+    """
+    Classify any number of rows via token-budget batches; results come back in row order.
+    concurrency > 1 switches to the async engine (N batches in flight, RPM/TPM limited).
+    on_batch(idxs, rows, returned) is called as each batch lands; returned[k] is False
+    where the model dropped the item and rows[k] is only the default.
+    metrics gets one "batch" record per request (tokens, latency, requested vs returned, retries).
+    """
+    batches = pack_batches(texts, max_tokens=max_tokens, max_items=max_items)
+    if verbose and batches:
+        sizes = [len(b) for b in batches]
+        print(f"     · {len(batches)} batches (items min/avg/max: "
+              f"{min(sizes)}/{sum(sizes)/len(sizes):.1f}/{max(sizes)})")
+
+    if concurrency > 1:
+        limiter = limiter or RateLimiter(RPM_LIMIT, TPM_LIMIT)
+        return asyncio.run(classify_batches_async(texts, batches, model=model, concurrency=concurrency,
+                                                  limiter=limiter, on_batch=on_batch, metrics=metrics,
+                                                  verbose=verbose))
+
+    out = [None] * len(texts)
+    for b_idx, idxs in enumerate(batches, start=1):
+        info = {}
+        by_i = _request_with_repair([texts[i] for i in idxs],
+                                    lambda sub: _request_batch(sub, model=model, metrics=info))
+        rows, returned = _split_returned(idxs, by_i)
+        for i, r in zip(idxs, rows):
+            out[i] = r
+        if on_batch:
+            on_batch(idxs, rows, returned)
+        if metrics is not None:
+            metrics.emit("batch", engine="sync", model=model, items=len(idxs), returned=sum(returned),
+                         **_status_counts(rows), **info)
+        if sleep:
+            time.sleep(sleep)
+        if verbose:
+            tok = sum(estimate_tokens(texts[i]) for i in idxs)
+            print(f"     · batch {b_idx}/{len(batches)}: {len(idxs)} items, ~{tok} tokens")
+    return out
+
+
+# ========= 3c) Async engine: N batches in flight, RPM/TPM token buckets =========
+RPM_LIMIT = 500                    # requests per minute (account quota)
+TPM_LIMIT = 200_000                # tokens per minute (prompt + completion)
+MAX_CONCURRENCY = 8                # default batches in flight when the async engine is used
+MAX_RETRIES = 6                    # per batch, for 429 / connection / 5xx errors
+COMPLETION_TOKENS_PER_ITEM = 80    # reserve for the JSON each item costs on the way back
+PROMPT_GUIDE_TOKENS = math.ceil(len(PROMPT_GUIDE) / 4)
+
+class RateLimiter:
+    """
+    Two token buckets (requests/min and tokens/min) shared by every in-flight batch.
+    Loop-agnostic and thread-safe: one limiter can serve several asyncio.run() calls, including
+    ones running at the same time in different threads (parallel sheets).
+    """
+    def __init__(self, rpm: int = RPM_LIMIT, tpm: int = TPM_LIMIT):
+        self.rpm, self.tpm = float(rpm), float(tpm)
+        self._req, self._tok = self.rpm, self.tpm
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._state = threading.Lock()                 # bucket arithmetic, any thread
+        self._locks = weakref.WeakKeyDictionary()      # event loop -> FIFO asyncio.Lock
+
+    def _refill(self):
+        now = time.monotonic()
+        dt, self._last = now - self._last, now
+        self._req = min(self.rpm, self._req + dt * self.rpm / 60)
+        self._tok = min(self.tpm, self._tok + dt * self.tpm / 60)
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        with self._state:
+            lock = self._locks.get(loop)
+            if lock is None:
+                lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    def _try_take(self, tokens: int) -> float:
+        """Take capacity if available -> 0.0, else the seconds to wait before trying again."""
+        with self._state:
+            self._refill()
+            wait = self._paused_until - time.monotonic()
+            if wait > 0:
+                return wait
+            if self._req >= 1 and self._tok >= tokens:
+                self._req -= 1
+                self._tok -= tokens
+                return 0.0
+            return max((1 - self._req) * 60 / self.rpm, (tokens - self._tok) * 60 / self.tpm)
+
+    async def acquire(self, tokens: int):
+        tokens = min(tokens, self.tpm)  # an oversized request must still fit an empty bucket
+        async with self._get_lock():   # FIFO: waiters are served in arrival order
+            while True:
+                wait = self._try_take(tokens)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+    def settle(self, reserved: int, actual: int):
+        """Correct the TPM bucket once real usage is known (may go negative = debt)."""
+        with self._state:
+            self._tok -= (actual - reserved)
+
+    def pause(self, seconds: float):
+        """Server said 429: stop handing out capacity to everyone for a while."""
+        with self._state:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+def _retry_after(exc) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def _backoff(attempt: int) -> float:
+    # exponential with full jitter, capped at 60s
+    return random.uniform(0, min(60.0, 2 ** attempt))
+
+async def _classify_batch_async(aclient, texts, limiter: RateLimiter, model=MODEL, metrics=None) -> dict:
+    reserved = (sum(estimate_tokens(t) for t in texts) + PROMPT_GUIDE_TOKENS
+                + COMPLETION_TOKENS_PER_ITEM * len(texts))
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire(reserved)
+        t = time.perf_counter()
+        try:
+            chat = await aclient.chat.completions.create(
+                model=model,
+                messages=_build_messages(texts),
+                response_format={"type": "json_object"},
+                temperature=0
+            )
+        except RateLimitError as e:
+            if attempt == MAX_RETRIES:
+                raise
+            limiter.pause(_retry_after(e) or _backoff(attempt + 1))
+            continue
+        except (APIConnectionError, APITimeoutError, InternalServerError):
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(_backoff(attempt + 1))
+            continue
+
+        usage = getattr(chat, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            limiter.settle(reserved, usage.total_tokens)
+        _record_call(metrics, t, chat, retries=attempt)
+        return _parse_items(chat.choices[0].message.content)
+
+async def classify_batches_async(texts, batches, model=MODEL,
+                                 concurrency: int = MAX_CONCURRENCY,
+                                 limiter: RateLimiter | None = None,
+                                 on_batch=None,
+                                 metrics: MetricsRecorder | None = None,
+                                 verbose: bool = False) -> list:
+    """
+    Run pre-packed batches (lists of row indices) concurrently; results come back in row order.
+    Uses the configure_client() settings (or OPENAI_BASE_URL), so it can run against fake_openai_server.py.
+    """
+    limiter = limiter or RateLimiter(RPM_LIMIT, TPM_LIMIT)
+    sem = asyncio.Semaphore(concurrency)
+    out = [None] * len(texts)
+    done = 0
+
+    async def run_one(b_idx, idxs):
+        nonlocal done
+        info = {}
+        sub = [texts[i] for i in idxs]
+        async with sem:
+            by_i = await _classify_batch_async(aclient, sub, limiter, model=model, metrics=info)
+            for _ in range(REPAIR_MAX_ROUNDS):  # same follow-up policy as _request_with_repair
+                missing = _needs_requery(by_i, len(sub))
+                if not missing:
+                    break
+                _merge_requery(by_i, missing, await _classify_batch_async(
+                    aclient, [sub[j] for j in missing], limiter, model=model, metrics=info))
+        rows, returned = _split_returned(idxs, by_i)
+        for i, r in zip(idxs, rows):
+            out[i] = r
+        if on_batch:
+            on_batch(idxs, rows, returned)
+        if metrics is not None:
+            metrics.emit("batch", engine="async", model=model, items=len(idxs), returned=sum(returned),
+                         **_status_counts(rows), **info)
+        done += 1
+        if verbose:
+            print(f"     · batch {b_idx}/{len(batches)} done: {len(idxs)} items ({done}/{len(batches)} complete)")
+
+    async with _async_client() as aclient:
+        await asyncio.gather(*(run_one(b_idx, idxs) for b_idx, idxs in enumerate(batches, start=1)))
+    return out
+
+
+# ========= 3c2) Run metrics (JSON lines + end-of-run summary) =========
+# USD per 1M tokens (input, output); Batch API jobs are billed at half these rates
+MODEL_PRICING = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+BATCH_API_DISCOUNT = 0.5
+
+class MetricsRecorder:
+    """
+    Structured telemetry for one run: every record is a JSON line (kind="batch" per API request,
+    kind="stage" per classification stage) with whatever tags tagged() added (e.g. sheet).
+    summary() aggregates tokens, p50/p95 latency, dropped items, retries and estimated cost.
+    The file is appended to, so a resumed run keeps the crashed run's records; every record
+    carries the run's start time ("run") to tell them apart.
+    """
+    def __init__(self, path: str | None = None, tags: dict | None = None, _shared=None):
+        self.path = path
+        self.tags = tags or {}
+        if _shared is None:
+            self.tags = {"run": time.strftime("%Y-%m-%dT%H:%M:%S"), **self.tags}
+            fh = open(path, "a", encoding="utf-8") if path else None
+            _shared = {"records": [], "lock": threading.Lock(), "fh": fh}
+        self._shared = _shared
+
+    @property
+    def records(self) -> list:
+        return self._shared["records"]
+
+    def tagged(self, **tags) -> "MetricsRecorder":
+        return MetricsRecorder(self.path, {**self.tags, **tags}, _shared=self._shared)
+
+    def emit(self, kind: str, **fields) -> None:
+        rec = {"ts": round(time.time(), 3), "kind": kind, **self.tags, **fields}
+        with self._shared["lock"]:
+            self._shared["records"].append(rec)
+            fh = self._shared["fh"]
+            if fh is not None:
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                fh.flush()
+
+    def summary(self) -> dict:
+        batches = [r for r in self.records if r["kind"] == "batch"]
+        stages = [r for r in self.records if r["kind"] == "stage"]
+        lat = [r["latency_s"] for r in batches if r.get("latency_s") is not None]
+        cost = 0.0
+        for r in batches:
+            p_in, p_out = MODEL_PRICING.get(r.get("model"), (0.0, 0.0))
+            c = (r.get("prompt_tokens", 0) * p_in + r.get("completion_tokens", 0) * p_out) / 1e6
+            cost += c * (BATCH_API_DISCOUNT if r.get("engine") == "batch_api" else 1.0)
+        out = {
+            "batches": len(batches),
+            "items_requested": sum(r["items"] for r in batches),
+            "items_returned": sum(r["returned"] for r in batches),
+            "retries": (sum(r.get("retries", 0) for r in batches)
+                        if any("retries" in r for r in batches) else None),  # None: sync client only
+            "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in batches),
+            "completion_tokens": sum(r.get("completion_tokens", 0) for r in batches),
+            "latency_p50_s": round(float(np.percentile(lat, 50)), 3) if lat else None,
+            "latency_p95_s": round(float(np.percentile(lat, 95)), 3) if lat else None,
+            "est_cost_usd": round(cost, 4),
+        }
+        out["items_defaulted"] = out["items_requested"] - out["items_returned"]
+        for k in ("repaired", "requeried"):
+            out[f"items_{k}"] = sum(r.get(k, 0) for r in batches)
+        for stage in ("prior", "rules", "dedup", "checkpoint", "cache", "local"):
+            out[f"{stage}_saved"] = sum(r["saved"] for r in stages if r["stage"] == stage)
+        return out
+
+    def close(self) -> dict:
+        """Append the summary record, close the file and return the summary."""
+        summ = self.summary()
+        self.emit("summary", **summ)
+        if self._shared["fh"] is not None:
+            self._shared["fh"].close()
+            self._shared["fh"] = None
+        return summ
+
+
+# ========= 3d) Persistent label cache (SQLite) =========
+# Overlapping scraper runs re-send the same posts. Labels are keyed by
+# (hash of normalized text, model, hash of PROMPT_GUIDE): a prompt or model change is a clean miss.
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".samsung_members", "label_cache.sqlite")
+CACHE_MAX_ROWS = 500_000
+CACHE_MAX_AGE_DAYS = 90
+PROMPT_HASH = hashlib.sha256(PROMPT_GUIDE.encode("utf-8")).hexdigest()[:16]
+
+def _norm_text(s) -> str:
+    """What the model effectively sees: clipped, NFKC-normalized, whitespace collapsed."""
+    s = unicodedata.normalize("NFKC", _clip(s))
+    return re.sub(r"\s+", " ", s).strip()
+
+def text_hash(s) -> str:
+    return hashlib.sha256(_norm_text(s).encode("utf-8")).hexdigest()
+
+class LabelCache:
+    """
+    On-disk label cache. Bulk get_many() before any API call, put_many() as batches land.
+    Eviction (evict()): entries older than max_age_days, then least-recently-used beyond max_rows.
+    Thread-safe (one connection behind a lock).
+    """
+    def __init__(self, path: str = CACHE_PATH,
+                 max_rows: int = CACHE_MAX_ROWS,
+                 max_age_days: float = CACHE_MAX_AGE_DAYS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path, self.max_rows, self.max_age_days = path, max_rows, max_age_days
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS labels (
+                text_hash   TEXT NOT NULL,
+                model       TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                label       TEXT NOT NULL,
+                created     REAL NOT NULL,
+                accessed    REAL NOT NULL,
+                PRIMARY KEY (text_hash, model, prompt_hash)
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS labels_accessed ON labels(accessed)")
+        self._db.commit()
+
+    def get_many(self, texts, model=MODEL) -> dict:
+        """Bulk lookup -> {row index: label row} for every cached text."""
+        hashes = [text_hash(t) for t in texts]
+        found = {}
+        uniq = list(dict.fromkeys(hashes))
+        with self._lock:
+            for k in range(0, len(uniq), 500):  # stay under SQLite's bound-variable limit
+                chunk = uniq[k:k + 500]
+                q = (f"SELECT text_hash, label FROM labels WHERE model=? AND prompt_hash=? "
+                     f"AND text_hash IN ({','.join('?' * len(chunk))})")
+                for h, label in self._db.execute(q, [model, PROMPT_HASH, *chunk]):
+                    found[h] = json.loads(label)
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE labels SET accessed=? WHERE text_hash=? AND model=? AND prompt_hash=?",
+                    [(now, h, model, PROMPT_HASH) for h in found])
+                self._db.commit()
+
+            out = {i: dict(found[h]) for i, h in enumerate(hashes) if h in found}
+            self.hits += len(out)
+            self.misses += len(texts) - len(out)
+        return out
+
+    def put_many(self, texts, rows, model=MODEL):
+        if not texts:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO labels VALUES (?,?,?,?,?,?)",
+                [(text_hash(t), model, PROMPT_HASH, json.dumps(r, ensure_ascii=False), now, now)
+                 for t, r in zip(texts, rows)])
+            self._db.commit()
+
+    def evict(self) -> int:
+        with self._lock:
+            n0 = self._db.total_changes
+            if self.max_age_days:
+                self._db.execute("DELETE FROM labels WHERE created < ?",
+                                 (time.time() - self.max_age_days * 86400,))
+            if self.max_rows:
+                self._db.execute("""
+                    DELETE FROM labels WHERE rowid IN (
+                        SELECT rowid FROM labels ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                    )""", (self.max_rows,))
+            self._db.commit()
+            return self._db.total_changes - n0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> str:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        rate = (100.0 * hits / total) if total else 0.0
+        return f"hits={hits} misses={misses} ({rate:.0f}% hit rate)"
+
+
+# ========= 3e) Near-duplicate collapsing (MinHash + LSH) =========
+# Cross-posts, templates and reposts are classified once per cluster and the labels fanned out.
+DEDUP_THRESHOLD = 0.9    # estimated Jaccard similarity of character shingles (1.0 = exact only)
+SHINGLE_SIZE = 5         # characters; works for unspaced scripts (Thai) too
+MINHASH_PERM = 64
+LSH_BANDS = 16           # 16 bands x 4 rows: pairs from ~0.5 similarity become candidates
+
+_MH_PRIME = 4294967291  # largest prime < 2**32: (a*h + b) stays inside uint64
+_mh_rng = np.random.RandomState(1905)  # fixed seed: same clusters on every run
+_MH_A = _mh_rng.randint(1, _MH_PRIME, size=MINHASH_PERM, dtype=np.int64).astype(np.uint64)
+_MH_B = _mh_rng.randint(0, _MH_PRIME, size=MINHASH_PERM, dtype=np.int64).astype(np.uint64)
+_MODEL_TOKEN_RE = re.compile(r"\w*\d\w*")
+
+def _dedup_norm(s) -> str:
+    return re.sub(r"[\W_]+", " ", _norm_text(s).lower()).strip()
+
+def _minhash(s: str):
+    if len(s) < SHINGLE_SIZE:
+        return None
+    sh = {zlib.crc32(s[k:k + SHINGLE_SIZE].encode("utf-8")) for k in range(len(s) - SHINGLE_SIZE + 1)}
+    h = np.fromiter(sh, dtype=np.uint64, count=len(sh))
+    return ((np.outer(_MH_A, h) + _MH_B[:, None]) % _MH_PRIME).min(axis=1)
+
+def collapse_near_duplicates(texts, threshold: float = DEDUP_THRESHOLD):
+    """
+    Group exact (after normalization) and near-duplicate texts.
+    Near-duplicates must also mention the same model-like tokens ("s23" vs "s24" never merge).
+    Returns (reps, assign): reps = row indices to classify (first row of each cluster),
+    assign[i] = position in reps whose label row i should get.
+    """
+    n = len(texts)
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)  # root = earliest row
+
+    norms = [_dedup_norm(t) for t in texts]
+    first = {}
+    for i, s in enumerate(norms):
+        j = first.setdefault(s, i)
+        if j != i:
+            union(j, i)
+
+    if threshold < 1.0:
+        uniq = list(first.values())
+        sigs = {i: _minhash(norms[i]) for i in uniq}
+        models = {i: frozenset(_MODEL_TOKEN_RE.findall(norms[i])) for i in uniq}
+        rows_per_band = MINHASH_PERM // LSH_BANDS
+        buckets = defaultdict(list)
+        for i in uniq:
+            sig = sigs[i]
+            if sig is None:
+                continue
+            for b in range(LSH_BANDS):
+                buckets[(b, sig[b * rows_per_band:(b + 1) * rows_per_band].tobytes())].append(i)
+        for members in buckets.values():
+            head = members[0]
+            for j in members[1:]:
+                if find(j) == find(head) or models[j] != models[head]:
+                    continue
+                if float(np.mean(sigs[head] == sigs[j])) >= threshold:
+                    union(head, j)
+
+    roots = [find(i) for i in range(n)]
+    reps = sorted(set(roots))
+    pos = {r: k for k, r in enumerate(reps)}
+    return reps, [pos[r] for r in roots]
+
+
+# ========= 3f) Rule-based fast path (no API call for confidently labeled posts) =========
+RULE_THRESHOLD = 0.85    # rows at/above this confidence skip the LLM
+
+CONTEST_RE  = re.compile(r"\b(contests?|giveaways?|give away|lucky draw|sweepstakes?|my entry|"
+                         r"winners? (?:announce\w*|list)|#\w+challenge)\b", re.I)
+PROMO_RE    = re.compile(r"(\bpromo(?:tions?|s)?\b|\bdiscount|\bvouchers?\b|\bcoupons?\b|\bcash ?back\b|"
+                         r"\bflash sale\b|\d+\s?% off\b|\bpre-?order (?:offer|deal)s?\b|\btrade-?in (?:offer|deal)s?\b)", re.I)
+SHOWCASE_RE = re.compile(r"(#?shot ?on ?(?:my )?galaxy|#withgalaxy|#\w*photography|\bphoto ?(?:dump|walk|of the day)\b|"
+                         r"\bsnapshots?\b|📷|📸)", re.I)
+HELP_RE     = re.compile(r"(how to|please help|need help|need advice|seek support|\bbug\b|\bfix\b|error code|"
+                         r"is it possible|\bissue\b|\bproblem\b|\?)", re.I)
+POS_RE      = re.compile(r"\b(lov(?:e|ed|ing)|great|awesome|amazing|excellent|beautiful|stunning|happy|thank(?:s| you)|"
+                         r"congrat\w*|impressive|best|nice)\b", re.I)
+NEG_RE      = re.compile(r"\b(not working|doesn'?t work|broken|issue|problem|drain\w*|overheat\w*|lag\w*|"
+                         r"crash\w*|disappointed|worst|bad|annoying|frustrat\w*|error|stuck|fail\w*)\b", re.I)
+MIX_RE      = re.compile(r"\b(but|however|though|although|yet|nevertheless)\b", re.I)
+
+# Support subtopics that can be read off keywords (checked only for help-seeking posts)
+SUBTOPIC_KEYWORDS = [(sub, re.compile(rx, re.I)) for sub, rx in [
+    ("Battery / Charging",     r"\bbatter(?:y|ies)\b|\bcharg(?:e|er|ing)\b|\bdrain"),
+    ("Camera",                 r"\bcamera\b|\blens\b|night mode|portrait mode"),
+    ("Screen / Display",       r"\bscreen\b|\bdisplay\b|green line|burn-?in|flicker"),
+    ("Connectivity / Network", r"wi-?fi|bluetooth|\bsignal\b|\bnetwork\b|\bsim\b|hotspot"),
+    ("Audio / Calls",          r"\bspeaker\b|\bmic(?:rophone)?\b|\bcalls?\b|\bvolume\b|\baudio\b"),
+    ("Software",               r"one ?ui|\bupdate\b|\bfirmware\b|android \d+"),
+    ("Storage / Memory",       r"\bstorage\b|memory full|\bram\b|sd card"),
+    ("Account",                r"samsung account|\blog ?in\b|\bpassword\b|\bsign ?in\b"),
+    ("Performance",            r"\blag\w*|\bslow\b|overheat\w*|\bfreez\w*|\bhang(?:s|ing)?\b"),
+    ("Warranty",               r"\bwarranty\b"),
+]]
+
+def _rule_sentiment(text: str) -> str:
+    pos, neg = bool(POS_RE.search(text)), bool(NEG_RE.search(text))
+    if pos and neg:
+        return "Mix" if MIX_RE.search(text) else "Negative"
+    return "Positive" if pos else "Negative" if neg else "Neutral"
+
+def rule_classify(text, author: str = "") -> tuple:
+    """
+    Deterministic pre-classifier. Returns (label row, confidence in [0, 1]).
+    Confident rules: official contest / promo posts (moderator, no help-seeking cues) and Samsung
+    Star photo showcases; member posts that merely mention a contest or promo go to the LLM.
+    Keyword support posts score just below RULE_THRESHOLD unless the threshold is lowered.
+    """
+    text = "" if text is None else str(text)
+    products = extract_products(text)
+    ss_product = PRODUCT_MATCHER.longest(text) or "No specific product"
+    row = {
+        "ss_product": ss_product,
+        "product_category": assign_category(ss_product) if products else "Others",
+        "sentiment": _rule_sentiment(text),
+        "topic": "Others",
+        "subtopic": "Others",
+        "brand_terms": products,
+    }
+    posted_by = classify_posted_by(author)
+    helpish = bool(HELP_RE.search(text))
+
+    def label(subtopic, topic, conf):
+        row["subtopic"], row["topic"] = subtopic, topic
+        return row, conf
+
+    if CONTEST_RE.search(text):
+        return label("Contest", "Contest", 0.95 if posted_by == "Moderator" and not helpish else 0.6)
+    if PROMO_RE.search(text):
+        return label("Promo", "Promo", 0.9 if posted_by == "Moderator" and not helpish else 0.6)
+    if posted_by == "Samsung Star" and SHOWCASE_RE.search(text) and not helpish:
+        if row["sentiment"] == "Neutral":
+            row["sentiment"] = "Positive"
+        return label("Camera", "Product (General)", 0.9)   # impressions, no help cues: see GENERAL_TOPIC_SUBTOPICS
+    if helpish:
+        hits = [sub for sub, rx in SUBTOPIC_KEYWORDS if rx.search(text)]
+        if len(hits) == 1:
+            return label(hits[0], SUBTOPIC_TOPIC[hits[0]], 0.8 if products else 0.7)
+        if hits:
+            return label(hits[0], SUBTOPIC_TOPIC[hits[0]], 0.5)
+    return row, 0.0
+
+
+# ========= 3g) Crash-safe checkpoint journal =========
+class CheckpointJournal:
+    """
+    Append-only JSONL journal next to the output: one fsync'ed line per completed batch,
+    labels keyed by (sheet, text hash). After a crash, run_pipeline reloads it and only
+    classifies rows whose batch never finished. Deleted once the output is written.
+    """
+    def __init__(self, path: str, model=MODEL):
+        self.path, self.model = path, model
+        self.done = defaultdict(dict)   # sheet -> {text hash: label row}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from the crash
+                    if rec.get("model") == model and rec.get("prompt") == PROMPT_HASH:
+                        self.done[rec["sheet"]].update(rec["rows"])
+        self._f = open(path, "a", encoding="utf-8")
+
+    def __len__(self):
+        return sum(len(v) for v in self.done.values())
+
+    def lookup(self, sheet: str, texts) -> dict:
+        """-> {row index: label row} for texts whose batch already completed."""
+        seen = self.done.get(sheet)
+        if not seen:
+            return {}
+        out = {}
+        for i, t in enumerate(texts):
+            r = seen.get(text_hash(t))
+            if r is not None:
+                out[i] = dict(r)
+        return out
+
+    def append(self, sheet: str, texts, rows):
+        rec = {"sheet": sheet, "model": self.model, "prompt": PROMPT_HASH,
+               "rows": {text_hash(t): r for t, r in zip(texts, rows)}}
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self, remove: bool = False):
+        with self._lock:
+            self._f.close()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ========= 3g2) Distilled local classifier (CPU-only, trained on past LLM labels) =========
+# pip install scikit-learn   (only needed for this backend)
+LOCAL_MODEL_PATH = os.path.join(os.path.expanduser("~"), ".samsung_members", "local_model.pkl")
+LOCAL_THRESHOLD = 0.8          # min calibrated confidence (over all labels) to skip the LLM
+LOCAL_LABELS = ("subtopic", "topic", "sentiment", "product_category")
+LOCAL_MIN_CLASS_ROWS = 5       # rarer classes are left to the LLM
+LOCAL_TRAIN_STATUSES = {"ok", "repaired", "requeried"}   # real model answers only
+PRIOR_REUSE_STATUSES = LOCAL_TRAIN_STATUSES | {"reused"}  # prior_output rows worth carrying forward
+
+class LocalClassifier:
+    """
+    Hashed word + character n-gram TF-IDF with one calibrated linear model per label, trained on
+    earlier *_classified_ai outputs. predict() returns (rows, confidences); run_pipeline sends rows
+    below local_threshold on to the LLM. ss_product / brand_terms come from the product matcher.
+    """
+    def __init__(self, models: dict, meta: dict | None = None):
+        self.models = models            # label -> fitted sklearn pipeline, or the one class seen (str)
+        self.meta = meta or {}
+
+    @staticmethod
+    def _pipeline():
+        from sklearn.calibration import CalibratedClassifierCV
+        from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+        from sklearn.pipeline import make_pipeline, make_union
+        from sklearn.svm import LinearSVC
+        features = make_union(
+            HashingVectorizer(analyzer="word", ngram_range=(1, 2), n_features=2 ** 20, alternate_sign=False),
+            HashingVectorizer(analyzer="char_wb", ngram_range=(3, 5), n_features=2 ** 20, alternate_sign=False),
+        )
+        return make_pipeline(features, TfidfTransformer(sublinear_tf=True),
+                             CalibratedClassifierCV(LinearSVC(C=0.5), cv=3, method="sigmoid"))
+
+    @classmethod
+    def fit(cls, texts, rows, verbose: bool = False) -> "LocalClassifier":
+        texts = [_norm_text(t) for t in texts]
+        models = {}
+        for label in LOCAL_LABELS:
+            y = pd.Series([r.get(label) or "" for r in rows])
+            counts = y[y.ne("")].value_counts()
+            common = counts[counts >= LOCAL_MIN_CLASS_ROWS].index
+            keep = y.isin(common).to_numpy()
+            if len(common) == 1:
+                models[label] = str(common[0])  # nothing to tell apart: predicted with confidence 1
+                if verbose:
+                    print(f"   - {label}: {int(keep.sum())} rows, 1 class ({common[0]})")
+                continue
+            if not len(common):
+                if label in ("subtopic", "sentiment"):  # predict() needs both
+                    raise ValueError(f"Cannot train the local classifier: no {label} class has "
+                                     f"{LOCAL_MIN_CLASS_ROWS}+ labeled rows")
+                if verbose:
+                    print(f"   - {label}: not enough labeled rows, left to the LLM")
+                continue
+            models[label] = cls._pipeline().fit([t for t, k in zip(texts, keep) if k], y[keep].tolist())
+            if verbose:
+                print(f"   - {label}: {int(keep.sum())} rows, {len(models[label].classes_)} classes")
+        return cls(models, {"rows": len(texts), "trained": time.strftime("%Y-%m-%d %H:%M:%S")})
+
+    def predict(self, texts) -> tuple:
+        """-> (label rows, confidence per row = min calibrated probability over the labels used)."""
+        norm = [_norm_text(t) for t in texts]
+        n = len(norm)
+        conf = np.ones(n)
+        preds = {}
+        for label, model in self.models.items():
+            if isinstance(model, str):
+                preds[label] = ([model] * n, np.ones(n))
+                continue
+            proba = model.predict_proba(norm) if n else np.zeros((0, 1))
+            preds[label] = (model.classes_[proba.argmax(axis=1)] if n else [], proba.max(axis=1) if n else [])
+
+        rows = []
+        for k, t in enumerate(texts):
+            row = _default_row()
+            product = PRODUCT_MATCHER.longest(str(t)) if t else None
+            if product:
+                row["ss_product"], row["brand_terms"] = product, extract_products(t)
+            c = 1.0
+            for label in ("subtopic", "sentiment"):
+                if label not in preds:
+                    c = 0.0
+                    continue
+                row[label], p = str(preds[label][0][k]), preds[label][1][k]
+                c = min(c, p)
+            if product:
+                row["product_category"] = assign_category(product)   # same rule as _parse_items
+            elif "product_category" in preds:
+                row["product_category"] = str(preds["product_category"][0][k])
+                c = min(c, preds["product_category"][1][k])
+            mapped = SUBTOPIC_TOPIC.get(row["subtopic"])
+            topic = str(preds["topic"][0][k]) if "topic" in preds else None
+            if mapped and not (topic == "Product (General)" and row["subtopic"] in GENERAL_TOPIC_SUBTOPICS):
+                row["topic"] = mapped
+            elif topic:
+                row["topic"] = topic
+                c = min(c, preds["topic"][1][k])
+            row["label_status"] = "local"
+            rows.append(row)
+            conf[k] = c
+        return rows, conf
+
+    def save(self, path: str = LOCAL_MODEL_PATH) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump({"models": self.models, "meta": self.meta, "prompt": PROMPT_HASH}, f)
+        return path
+
+    @classmethod
+    def load(cls, path: str = LOCAL_MODEL_PATH) -> "LocalClassifier":
+        path = os.path.expanduser(path)
+        with open(path, "rb") as f:   # pickle: only load models you trained yourself
+            data = pickle.load(f)
+        if data.get("prompt") != PROMPT_HASH:
+            print(f"⚠️ Local model {path} was trained under a different prompt; retrain when convenient")
+        return cls(data["models"], data.get("meta"))
+
+def train_local_classifier(paths, out_path: str = LOCAL_MODEL_PATH,
+                           text_col_pref=("Full text (EN)", "Combined Text (EN)"),
+                           holdout: float = 0.1,
+                           verbose: bool = True) -> LocalClassifier:
+    """
+    Train the local backend from earlier *_classified_ai outputs (.xlsx or .parquet) and save it.
+    Rows labeled by rules / defaults are skipped. With verbose, a holdout split reports accuracy and
+    how many rows would clear LOCAL_THRESHOLD before the final model is fit on everything.
+    """
+    texts, rows = [], []
+    for path in ([paths] if isinstance(paths, str) else paths):
+        sheet_names, load = open_input(path)
+        for sh in sheet_names:
+            df = load(sh)
+            if not set(LABEL_COLUMNS).issubset(df.columns):
+                continue
+            if "Label Status" in df.columns:
+                df = df[df["Label Status"].fillna("ok").isin(LOCAL_TRAIN_STATUSES)]
+            text_c = ensure_text_column(df, text_col_pref)
+            texts += df[text_c].fillna("").astype(str).tolist()
+            labels = df[list(LABEL_COLUMNS)].fillna("").astype(str).rename(columns=LABEL_COLUMNS)
+            rows += labels.to_dict("records")
+    if verbose:
+        print(f"🧠 Training local classifier on {len(texts)} labeled rows")
+    if not texts:
+        raise ValueError("No labeled rows found; pass *_classified_ai outputs")
+
+    if verbose and holdout and len(texts) >= 200:
+        rnd = np.random.RandomState(0).rand(len(texts)) < holdout
+        train_i, test_i = np.flatnonzero(~rnd), np.flatnonzero(rnd)
+        probe = LocalClassifier.fit([texts[i] for i in train_i], [rows[i] for i in train_i])
+        pred, conf = probe.predict([texts[i] for i in test_i])
+        sure = conf >= LOCAL_THRESHOLD
+        for label in ("subtopic", "sentiment", "product_category"):
+            ok = np.array([p[label] == rows[i][label] for p, i in zip(pred, test_i)])
+            acc_sure = f"{ok[sure].mean():.1%}" if sure.any() else "n/a (none)"
+            print(f"   - holdout {label}: acc {ok.mean():.1%} overall, {acc_sure} on confident rows")
+        print(f"   - holdout coverage at {LOCAL_THRESHOLD}: {sure.mean():.1%} of rows skip the LLM")
+
+    model = LocalClassifier.fit(texts, rows, verbose=verbose)
+    model.save(out_path)
+    if verbose:
+        print(f"💾 Local model → {out_path}")
+    return model
+
+
+# ========= 3h) Classification stages (rules -> dedup -> checkpoint/cache -> batches) =========
+def classify_texts(texts, model=MODEL,
+                   authors=None,
+                   post_keys=None,
+                   prior: PriorLabels | None = None,
+                   rule_threshold: float | None = None,
+                   cache: LabelCache | None = None,
+                   dedup_threshold: float | None = DEDUP_THRESHOLD,
+                   journal: CheckpointJournal | None = None,
+                   sheet: str = "",
+                   runner=None,
+                   local_model: LocalClassifier | None = None,
+                   local_threshold: float = LOCAL_THRESHOLD,
+                   metrics: MetricsRecorder | None = None,
+                   verbose: bool = False,
+                   **batch_kw) -> list:
+    """
+    Label every text, reusing prior-run labels for unchanged posts (prior + post_keys), paying
+    the API only for rows the local rules are unsure about,
+    only for one representative per duplicate cluster and only for what neither the
+    checkpoint journal (batches finished before a crash) nor the cache can answer, and -
+    with a local_model - only for rows it is not confident about (conf < local_threshold).
+    authors (parallel to texts) feed the rules; batch_kw are passed to the runner
+    (default classify_in_batches: max_tokens, max_items, concurrency, limiter).
+    metrics gets a "stage" record per stage (rows in, rows saved) and the runner's batch records.
+    """
+    if metrics is not None and "sheet" not in metrics.tags:
+        metrics = metrics.tagged(sheet=sheet)
+
+    if prior is not None and post_keys is not None and texts:
+        out = [None] * len(texts)
+        for i, r in prior.lookup(post_keys).items():
+            out[i] = r
+        todo = [i for i, r in enumerate(out) if r is None]
+        if metrics is not None:
+            metrics.emit("stage", stage="prior", rows=len(texts), saved=len(texts) - len(todo))
+        if verbose:
+            print(f"     · prior output: {len(texts) - len(todo)} rows reused / {len(todo)} new or edited")
+        if todo:
+            rows = classify_texts([texts[i] for i in todo], model=model,
+                                  authors=[authors[i] for i in todo] if authors is not None else None,
+                                  rule_threshold=rule_threshold, cache=cache, dedup_threshold=dedup_threshold,
+                                  journal=journal, sheet=sheet, runner=runner, local_model=local_model,
+                                  local_threshold=local_threshold, metrics=metrics, verbose=verbose, **batch_kw)
+            for i, r in zip(todo, rows):
+                out[i] = r
+        return out
+    if rule_threshold is not None and texts:
+        authors = authors if authors is not None else [""] * len(texts)
+        out, todo = [None] * len(texts), []
+        for i, (t, a) in enumerate(zip(texts, authors)):
+            row, conf = rule_classify(t, a)
+            if conf >= rule_threshold:
+                out[i] = {**row, "label_status": "rule"}
+            else:
+                todo.append(i)
+        if metrics is not None:
+            metrics.emit("stage", stage="rules", rows=len(texts), saved=len(texts) - len(todo))
+        if verbose:
+            skipped = len(texts) - len(todo)
+            print(f"     · rules: {skipped}/{len(texts)} rows labeled locally "
+                  f"({100.0 * skipped / len(texts):.0f}% skip rate)")
+        if todo:
+            rows = classify_texts([texts[i] for i in todo], model=model, rule_threshold=None, cache=cache,
+                                  dedup_threshold=dedup_threshold, journal=journal, sheet=sheet,
+                                  runner=runner, local_model=local_model, local_threshold=local_threshold,
+                                  metrics=metrics, verbose=verbose, **batch_kw)
+            for i, r in zip(todo, rows):
+                out[i] = r
+        return out
+
+    if dedup_threshold is not None and len(texts) > 1:
+        reps, assign = collapse_near_duplicates(texts, threshold=dedup_threshold)
+        if metrics is not None:
+            metrics.emit("stage", stage="dedup", rows=len(texts), saved=len(texts) - len(reps))
+        if verbose:
+            print(f"     · dedup: {len(texts)} rows -> {len(reps)} unique "
+                  f"(saved {len(texts) - len(reps)} API items)")
+        rep_rows = classify_texts([texts[i] for i in reps], model=model, rule_threshold=None, cache=cache,
+                                  dedup_threshold=None, journal=journal, sheet=sheet,
+                                  runner=runner, local_model=local_model, local_threshold=local_threshold,
+                                  metrics=metrics, verbose=verbose, **batch_kw)
+        return [dict(rep_rows[a]) for a in assign]  # copies: rows are mutable dicts
+
+    out = [None] * len(texts)
+    todo = list(range(len(texts)))
+
+    if journal is not None:
+        for i, r in journal.lookup(sheet, texts).items():
+            out[i] = r
+        todo = [i for i in todo if out[i] is None]
+        if metrics is not None:
+            metrics.emit("stage", stage="checkpoint", rows=len(texts), saved=len(texts) - len(todo))
+        if verbose and len(todo) < len(texts):
+            print(f"     · checkpoint: resumed {len(texts) - len(todo)} rows from finished batches")
+
+    if cache is not None and todo:
+        for k, r in cache.get_many([texts[i] for i in todo], model=model).items():
+            out[todo[k]] = r
+        n_todo = len(todo)
+        todo = [i for i in todo if out[i] is None]
+        if metrics is not None:
+            metrics.emit("stage", stage="cache", rows=n_todo, saved=n_todo - len(todo))
+        if verbose:
+            print(f"     · cache: {n_todo - len(todo)} hit / {len(todo)} to classify")
+
+    if local_model is not None and todo:
+        rows, conf = local_model.predict([texts[i] for i in todo])
+        n_todo = len(todo)
+        for i, r, c in zip(todo, rows, conf):
+            if c >= local_threshold:
+                out[i] = r
+        todo = [i for i in todo if out[i] is None]
+        if metrics is not None:
+            metrics.emit("stage", stage="local", rows=n_todo, saved=n_todo - len(todo))
+        if verbose:
+            print(f"     · local model: {n_todo - len(todo)}/{n_todo} rows confident (≥ {local_threshold})")
+
+    if todo:
+        sub = [texts[i] for i in todo]
+
+        def store(idxs, rows, returned):
+            if journal is not None:
+                journal.append(sheet, [sub[j] for j in idxs], rows)
+            if cache is not None:
+                # only real model answers are cached, never the fill-in defaults
+                keep = [(sub[j], r) for j, r, ok in zip(idxs, rows, returned) if ok]
+                cache.put_many([t for t, _ in keep], [r for _, r in keep], model=model)
+
+        rows = (runner or classify_in_batches)(
+            sub, model=model, on_batch=store if (cache is not None or journal is not None) else None,
+            metrics=metrics, verbose=verbose, **batch_kw)
+        for i, r in zip(todo, rows):
+            out[i] = r
+    return out
+
+
+# ========= 3i) Offline Batch API mode (nightly backfills) =========
+BATCH_POLL_SECONDS = 30
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+class BatchApiJob:
+    """
+    Two-pass bulk mode. collect() is a classify_in_batches stand-in that only records the
+    token-budget batches; run() writes them to JSONL, submits one Batch API job, polls it,
+    downloads and parses the output (same _parse_items normalization) and feeds each
+    request's labels to its on_batch hook (journal / cache); answer() then serves the labels.
+    Rerunning with the same input reattaches to the job recorded in <stem>.batch_job.json.
+    """
+    def __init__(self, stem: str, model=MODEL, poll_seconds: float = BATCH_POLL_SECONDS):
+        self.input_path = stem + ".batch_input.jsonl"
+        self.state_path = stem + ".batch_job.json"
+        self.model, self.poll_seconds = model, poll_seconds
+        self.requests = []   # (custom_id, texts, idxs, on_batch)
+        self.results = {}    # text hash -> label row
+
+    def collect(self, texts, model=MODEL, on_batch=None, metrics=None, verbose=False,
+                max_tokens: int = BATCH_MAX_TOKENS, max_items: int = BATCH_MAX_ITEMS, **_):
+        for idxs in pack_batches(texts, max_tokens=max_tokens, max_items=max_items):
+            self.requests.append((f"req-{len(self.requests)}", [texts[i] for i in idxs], idxs, on_batch, metrics))
+        return [_default_row() for _ in texts]
+
+    def answer(self, texts, **_):
+        return [dict(self.results[h]) if h in self.results else {**_default_row(), "label_status": "default"}
+                for h in map(text_hash, texts)]
+
+    def _write_input(self) -> str:
+        h = hashlib.sha256()
+        with open(self.input_path, "w", encoding="utf-8") as f:
+            for cid, texts, *_ in self.requests:
+                line = json.dumps({
+                    "custom_id": cid, "method": "POST", "url": "/v1/chat/completions",
+                    "body": {"model": self.model, "messages": _build_messages(texts),
+                             "response_format": {"type": "json_object"}, "temperature": 0},
+                }, ensure_ascii=False) + "\n"
+                f.write(line)
+                h.update(line.encode("utf-8"))
+        return h.hexdigest()
+
+    def _submit(self, digest: str, verbose: bool) -> str:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("sha256") == digest:
+                job = get_client().batches.retrieve(state["batch_id"])
+                if job.status not in ("failed", "expired", "cancelled"):
+                    if verbose:
+                        print(f"   - Reattaching to batch job {job.id} ({job.status})")
+                    return job.id
+
+        with open(self.input_path, "rb") as f:
+            upload = get_client().files.create(file=f, purpose="batch")
+        job = get_client().batches.create(input_file_id=upload.id, endpoint="/v1/chat/completions",
+                                    completion_window=BATCH_COMPLETION_WINDOW)
+        with open(self.state_path, "w", encoding="utf-8") as f:
+            json.dump({"batch_id": job.id, "sha256": digest}, f)
+        if verbose:
+            print(f"   - Submitted batch job {job.id}")
+        return job.id
+
+    def _wait(self, batch_id: str, verbose: bool):
+        while True:
+            job = get_client().batches.retrieve(batch_id)
+            if verbose:
+                rc = getattr(job, "request_counts", None)
+                done = f" ({rc.completed + rc.failed}/{rc.total} requests)" if rc else ""
+                print(f"   ⏳ {batch_id}: {job.status}{done}")
+            if job.status in BATCH_FINAL_STATES:
+                return job
+            time.sleep(self.poll_seconds)
+
+    def _download(self, job) -> dict:
+        """-> {custom_id: (message content, usage dict)} for every successful request in the output file."""
+        out = {}
+        if not getattr(job, "output_file_id", None):
+            return out
+        for line in get_client().files.content(job.output_file_id).text.splitlines():
+            try:
+                rec = json.loads(line)
+                resp = rec.get("response") or {}
+                if resp.get("status_code") == 200:
+                    body = resp["body"]
+                    u = body.get("usage") or {}
+                    out[rec["custom_id"]] = (body["choices"][0]["message"]["content"],
+                                             {"prompt_tokens": u.get("prompt_tokens", 0),
+                                              "completion_tokens": u.get("completion_tokens", 0)})
+            except (ValueError, KeyError, IndexError, TypeError):
+                continue
+        return out
+
+    def run(self, verbose: bool = True) -> None:
+        if not self.requests:
+            return
+        n_items = sum(len(r[1]) for r in self.requests)
+        if verbose:
+            print(f"📦 Batch API: {len(self.requests)} requests / {n_items} items → {self.input_path}")
+        batch_id = self._submit(self._write_input(), verbose)
+        job = self._wait(batch_id, verbose)
+        contents = self._download(job)
+        if job.status != "completed" and not contents:
+            raise RuntimeError(f"Batch job {batch_id} ended with status '{job.status}' and no output")
+
+        for cid, texts, idxs, on_batch, metrics in self.requests:
+            content, usage = contents.get(cid, (None, {}))
+            by_i, info = _parse_items(content), {}
+            for _ in range(REPAIR_MAX_ROUNDS):  # small follow-ups go through the interactive API
+                missing = _needs_requery(by_i, len(texts))
+                if not missing:
+                    break
+                _merge_requery(by_i, missing, _request_batch([texts[j] for j in missing], model=self.model,
+                                                             metrics=info))
+            rows, returned = _split_returned(idxs, by_i)
+            if metrics is not None:
+                metrics.emit("batch", engine="batch_api", model=self.model, items=len(idxs),
+                             returned=sum(returned), latency_s=None, retries=0, **_status_counts(rows), **usage)
+                if info:
+                    metrics.emit("batch", engine="sync", model=self.model, items=0, returned=0, **info)
+            for t, r, ok in zip(texts, rows, returned):
+                if ok:
+                    self.results[text_hash(t)] = r
+            if on_batch:
+                on_batch(idxs, rows, returned)
+        if verbose:
+            print(f"   - Batch job {batch_id}: {len(contents)}/{len(self.requests)} requests answered, "
+                  f"{len(self.results)} labels")
+
+        for path in (self.input_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
 # ========= 4) Helpers: open excel, find author column =========
-def open_excel_file(path: str) -> pd.ExcelFile:
+def _check_excel_path(path: str) -> None:
     if not os.path.exists(path):
         raise FileNotFoundError(f"Input file not found: {path}")
     ext = os.path.splitext(path)[1].lower()
-    if ext in (".xlsx", ".xlsm", ".xltx", ".xltm"):
-        return pd.ExcelFile(path, engine="openpyxl")
-    raise ValueError(f"Unsupported file extension '{ext}'. Use a decrypted .xlsx")
+    if ext not in (".xlsx", ".xlsm", ".xltx", ".xltm"):
+        raise ValueError(f"Unsupported file extension '{ext}'. Use a decrypted .xlsx")
+
+def open_excel_file(path: str) -> pd.ExcelFile:
+    _check_excel_path(path)
+    return pd.ExcelFile(path, engine="openpyxl")
+
+# ---- Parquet (Arrow) hand-off: scraper.py can write .parquet, we can read/write it too ----
+PARQUET_EXTS = (".parquet", ".pq")
+SHEET_COLUMN = "Sheet"   # multi-sheet results live in one Parquet file, partitioned by this column
+
+def is_parquet(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in PARQUET_EXTS
+
+def _sheet_title(name: str) -> str:
+    return re.sub(r"[\[\]:*?/\\]", "_", str(name))[:31] or "Sheet1"  # Excel sheet-name rules
+
+def open_input(path: str):
+    """
+    -> (sheet names, load(sheet) -> DataFrame) for .xlsx workbooks and .parquet hand-off files.
+    A Parquet file is one sheet (named after the file) unless it carries a SHEET_COLUMN.
+    """
+    if not is_parquet(path):
+        xl = open_excel_file(path)
+        return xl.sheet_names, xl.parse
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Input file not found: {path}")
+    df = pd.read_parquet(path)
+    if SHEET_COLUMN in df.columns:
+        groups = {str(k): g.drop(columns=SHEET_COLUMN).reset_index(drop=True)
+                  for k, g in df.groupby(SHEET_COLUMN, sort=False)}
+    else:
+        groups = {_sheet_title(os.path.splitext(os.path.basename(path))[0]): df}
+    del df
+    return list(groups), groups.pop  # pop: each frame is released once handed out
+
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """Object columns mixing types (e.g. ints and strings from Excel) become strings for Arrow."""
+    for c in df.columns:
+        if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) not in (
+                "string", "empty", "integer", "floating", "boolean", "datetime", "date"):
+            df[c] = df[c].astype("string")
+    return df
+
+def write_parquet_sheets(processed: dict, out_path: str) -> None:
+    """All sheets -> one Parquet file, SHEET_COLUMN tells them apart; label columns are always strings."""
+    frames = [df.assign(**{SHEET_COLUMN: sh}) for sh, df in processed.items()]
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[SHEET_COLUMN])
+    for c in OUTPUT_COLUMNS:
+        if c in out.columns:
+            out[c] = out[c].astype("string")
+    _arrow_safe(out).to_parquet(out_path, index=False)
+
+def export_excel(parquet_path: str, out_path: str | None = None) -> str:
+    """Presentation step: Parquet results -> .xlsx, one sheet per SHEET_COLUMN value."""
+    sheet_names, load = open_input(parquet_path)
+    out_path = out_path or os.path.splitext(parquet_path)[0] + ".xlsx"
+    with pd.ExcelWriter(out_path, engine="openpyxl") as w:
+        for sh in sheet_names:
+            load(sh).to_excel(w, sheet_name=_sheet_title(sh), index=False)
+    return out_path
 
 def find_author_column(df: pd.DataFrame) -> str | None:
     # robust: supports AuthorName
@@ -254,6 +1673,14 @@ def find_author_column(df: pd.DataFrame) -> str | None:
             return c
     return None
 
+def find_url_column(df: pd.DataFrame) -> str | None:
+    keys = ["url", "posturl", "link", "permalink"]
+    for c in df.columns:
+        norm = re.sub(r"[\s_]+", "", str(c).strip().lower())
+        if norm in keys:
+            return c
+    return None
+
 def find_replies_column(df: pd.DataFrame) -> str | None:
     # flexible
     keys = ["repliescount", "replycount", "commentcount", "comments", "replies"]
@@ -264,92 +1691,434 @@ def find_replies_column(df: pd.DataFrame) -> str | None:
     return None
 
 
+# ========= 4b) Derived columns (column-at-a-time, no per-row apply) =========
+LABEL_COLUMNS = {
+    "SS Product": "ss_product",
+    "Product Category": "product_category",
+    "Sentiment": "sentiment",
+    "Topic": "topic",
+    "Subtopic": "subtopic",
+}
+# Columns the classifier appends, in output order (stable schema for the Parquet hand-off)
+OUTPUT_COLUMNS = [*LABEL_COLUMNS, "Brand Terms", "Posted By", "Replied (Y/N)", "Label Status"]
+
+def ensure_text_column(df: pd.DataFrame, text_col_pref=("Full text (EN)", "Combined Text (EN)")) -> str:
+    """Pick the text column, or build 'Combined Text (EN)' = title + body (empty parts skipped)."""
+    text_col = next((c for c in text_col_pref if c in df.columns), None)
+    if text_col:
+        return text_col
+
+    title_col = next((c for c in df.columns if "title" in str(c).lower()), None)
+    body_col  = next((c for c in df.columns if any(k in str(c).lower() for k in ["full text","snippet","content","body"])), None)
+    empty = pd.Series("", index=df.index, dtype=object)
+    t = df[title_col].fillna("").astype(str) if title_col is not None else empty
+    b = df[body_col].fillna("").astype(str) if body_col is not None else empty
+    t_ok, b_ok = t.str.strip().ne(""), b.str.strip().ne("")
+    combined = np.where(t_ok & b_ok, t + " " + b, np.where(t_ok, t, np.where(b_ok, b, "")))
+    df["Combined Text (EN)"] = pd.Series(combined, index=df.index).str.strip()
+    return "Combined Text (EN)"
+
+def add_label_columns(df: pd.DataFrame, rows) -> None:
+    labels = pd.DataFrame.from_records(rows, columns=[*LABEL_COLUMNS.values(), "brand_terms", "label_status"])
+    for col, key in LABEL_COLUMNS.items():
+        df[col] = labels[key].to_numpy()
+    df["Brand Terms"] = labels["brand_terms"].map(lambda bt: "; ".join(map(str, bt or []))).to_numpy()
+    # rule / model / follow-up / default provenance; rows cached before this column existed count as "ok"
+    df["Label Status"] = labels["label_status"].fillna("ok").to_numpy()
+
+def posted_by_column(authors: pd.Series) -> np.ndarray:
+    """classify_posted_by once per distinct author, then broadcast back."""
+    codes, uniq = pd.factorize(authors.fillna("").astype(str))
+    return np.asarray([classify_posted_by(a) for a in uniq], dtype=object)[codes]
+
+def replied_column(replies: pd.Series) -> np.ndarray:
+    """'Y' when the reply count is a non-zero number, else 'N' (missing / non-numeric -> 'N')."""
+    n = pd.to_numeric(replies, errors="coerce").fillna(0).to_numpy()
+    return np.where(n == 0, "N", "Y").astype(object)
+
+
+# ========= 4b2) Incremental runs: reuse labels from a previous output =========
+def _norm_url(u) -> str:
+    return str(u or "").strip().split("#")[0].rstrip("/")
+
+def post_keys(df: pd.DataFrame, text_col: str) -> list | None:
+    """
+    Per-row identity for incremental runs: URL + hash of the classified text and the full post
+    body (FullText), so an edited post gets a new key. None when the sheet has no URL column.
+    """
+    url_c = find_url_column(df)
+    if url_c is None:
+        return None
+    sig = df[text_col].fillna("").astype(str)
+    body_c = next((c for c in df.columns
+                   if c != text_col and re.sub(r"[\s_]+", "", str(c).strip().lower()) == "fulltext"), None)
+    if body_c is not None:
+        sig = sig + "\x1f" + df[body_c].fillna("").astype(str)
+    return [f"{u}|{text_hash(t)}" if u else "" for u, t in zip(df[url_c].map(_norm_url), sig)]
+
+class PriorLabels:
+    """
+    Labels from earlier *_classified_ai outputs (.xlsx / .parquet), keyed by post_keys().
+    A post whose URL and text are both unchanged keeps its labels; new or edited posts
+    (e.g. a changed FullText) miss and go through the normal stages. Only real model answers
+    (LOCAL_TRAIN_STATUSES, or rows already reused from one) are carried forward: "default" /
+    "invalid" fillers are classified again.
+    """
+    def __init__(self, paths, text_col_pref=("Full text (EN)", "Combined Text (EN)"), verbose: bool = False):
+        self.rows = {}
+        for path in ([paths] if isinstance(paths, str) else paths):
+            sheet_names, load = open_input(path)
+            for sh in sheet_names:
+                df = load(sh)
+                if not set(LABEL_COLUMNS).issubset(df.columns):
+                    continue
+                if "Label Status" in df.columns:
+                    df = df[df["Label Status"].fillna("ok").isin(PRIOR_REUSE_STATUSES)].reset_index(drop=True)
+                keys = post_keys(df, ensure_text_column(df, text_col_pref))
+                if keys is None:
+                    continue
+                labels = df[list(LABEL_COLUMNS)].fillna("").astype(str).rename(columns=LABEL_COLUMNS)
+                brand = (df["Brand Terms"].fillna("").astype(str) if "Brand Terms" in df.columns
+                         else pd.Series("", index=df.index))
+                for k, row, bt in zip(keys, labels.to_dict("records"), brand.tolist()):
+                    if k:
+                        row["brand_terms"] = [b for b in bt.split("; ") if b]
+                        self.rows[k] = row
+            if verbose:
+                print(f"♻️ Prior labels: {len(self.rows)} posts from {path}")
+
+    def __len__(self):
+        return len(self.rows)
+
+    def lookup(self, keys) -> dict:
+        """-> {row index: label row (label_status "reused")} for unchanged posts."""
+        out = {}
+        for i, k in enumerate(keys):
+            r = self.rows.get(k) if k else None
+            if r is not None:
+                out[i] = {**r, "brand_terms": list(r["brand_terms"]), "label_status": "reused"}
+        return out
+
+
+# ========= 4c) Streaming Excel I/O (memory bounded by one sheet / one chunk) =========
+STREAM_CHUNK_ROWS = 50_000   # rows per chunk for very large sheets in streaming mode
+
+def excel_sheet_names(path: str) -> list:
+    _check_excel_path(path)
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+def iter_sheet_frames(path: str, chunk_rows: int | None = None):
+    """
+    Read sheets one at a time in openpyxl read-only mode.
+    Yields (sheet_name, df, is_first_chunk); with chunk_rows a sheet arrives as several frames.
+    """
+    _check_excel_path(path)
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            cols = [str(c) if c is not None else f"Unnamed: {k}" for k, c in enumerate(header)]
+            width = len(cols)
+            buf, first = [], True
+            for r in rows:
+                if r is None or all(v is None for v in r):
+                    continue
+                r = tuple(r[:width]) + (None,) * (width - len(r))
+                buf.append(r)
+                if chunk_rows and len(buf) >= chunk_rows:
+                    yield ws.title, pd.DataFrame(buf, columns=cols), first
+                    buf, first = [], False
+            if buf or first:
+                yield ws.title, pd.DataFrame(buf, columns=cols), first
+    finally:
+        wb.close()
+
+class StreamingSheetWriter:
+    """Write-only workbook: each appended frame goes straight to openpyxl's temp storage."""
+    def __init__(self, out_path: str):
+        self.out_path = out_path
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._sheets = {}
+
+    def append(self, sheet: str, df: pd.DataFrame):
+        ws = self._sheets.get(sheet)
+        if ws is None:
+            ws = self._sheets[sheet] = self._wb.create_sheet(title=sheet)
+            ws.append([str(c) for c in df.columns])
+        cells = df.astype(object).where(df.notna(), None)
+        for row in cells.itertuples(index=False, name=None):
+            ws.append(list(row))
+
+    def close(self):
+        if not self._sheets:
+            self._wb.create_sheet(title="Sheet1")  # openpyxl cannot save a workbook without sheets
+        self._wb.save(self.out_path)
+
+
 # ========= 5) PIPELINE (with progress) =========
+def prepare_sheet(df: pd.DataFrame, text_col_pref=("Full text (EN)", "Combined Text (EN)")) -> tuple:
+    """-> (texts, authors or None, post keys or None, author column): the classifier inputs of one sheet."""
+    # Text column selection (builds Combined Text (EN) if needed)
+    text_col = ensure_text_column(df, text_col_pref)
+    texts = df[text_col].fillna("").astype(str).tolist()
+    author_c = find_author_column(df)
+    authors = df[author_c].fillna("").astype(str).tolist() if author_c else None
+    return texts, authors, post_keys(df, text_col), author_c
+
+def process_sheet(df: pd.DataFrame, classify, text_col_pref=("Full text (EN)", "Combined Text (EN)"),
+                  verbose: bool = True) -> pd.DataFrame:
+    """Text column -> labels (classify(texts, authors, keys) -> rows) -> Posted By / Replied (Y/N)."""
+    texts, authors, keys, author_c = prepare_sheet(df, text_col_pref)
+
+    # AI classify
+    if verbose:
+        print(f"   - Classifying via {MODEL} ...")
+    t_cls = time.time()
+    rows = classify(texts, authors, keys)
+    if verbose:
+        print(f"   - Classified {len(rows)} rows ({time.time()-t_cls:.1f}s)")
+    return finish_sheet(df, rows, author_c, verbose=verbose)
+
+def finish_sheet(df: pd.DataFrame, rows, author_c: str | None, verbose: bool = False) -> pd.DataFrame:
+    """Label columns + Posted By + Replied (Y/N): the CPU-only tail of a sheet."""
+    add_label_columns(df, rows)
+
+    # Posted By (AuthorName supported)
+    if verbose:
+        print(f"   - Posted By from: {author_c if author_c else '(none -> Member)'}")
+    df["Posted By"] = posted_by_column(df[author_c]) if author_c else "Member"
+
+    # Replied (Y/N)
+    replies_c = find_replies_column(df)
+    if replies_c:
+        df["Replied (Y/N)"] = replied_column(df[replies_c])
+        if verbose:
+            zero = int((df["Replied (Y/N)"] == "N").sum())
+            print(f"   - Replied (Y/N) from '{replies_c}' (zero: {zero})")
+    else:
+        df["Replied (Y/N)"] = "N"
+        if verbose:
+            print("   - Replied (Y/N): replies column not found -> default N")
+    return df
+
+def _prepare_sheet_worker(in_path: str, sheet: str, text_col_pref) -> tuple:
+    # runs in a worker process: each one opens the workbook (read-only, lazily per sheet) itself
+    df = open_excel_file(in_path).parse(sheet)
+    return (df, *prepare_sheet(df, text_col_pref))
+
+def process_sheets_parallel(in_path: str, sheet_names, load, classify_sheet,
+                            text_col_pref=("Full text (EN)", "Combined Text (EN)"),
+                            workers: int = 4, verbose: bool = True) -> dict:
+    """
+    Several sheets at once: workbook parsing and text preparation run in a process pool (CPU),
+    classification and the (vectorized, cheap) output columns in threads, so API waits overlap
+    (the RateLimiter / cache / journal are shared) and the finished frame is never copied
+    between processes.
+    -> {sheet: DataFrame} in sheet_names order, whatever order the sheets finish in.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    excel = not is_parquet(in_path)
+
+    with ProcessPoolExecutor(max_workers=workers) as procs, ThreadPoolExecutor(max_workers=workers) as threads:
+        def one(sh):
+            t = time.time()
+            if excel:
+                df, texts, authors, keys, author_c = procs.submit(
+                    _prepare_sheet_worker, in_path, sh, text_col_pref).result()
+            else:
+                df = load(sh)  # Parquet is already parsed in memory
+                texts, authors, keys, author_c = prepare_sheet(df, text_col_pref)
+            rows = classify_sheet(sh, verbose=False)(texts, authors, keys)
+            df = finish_sheet(df, rows, author_c)
+            if verbose:
+                print(f"✅ Finished '{sh}' ({len(df)} rows) in {time.time()-t:.1f}s")
+            return df
+
+        futures = {sh: threads.submit(one, sh) for sh in sheet_names}
+        return {sh: f.result() for sh, f in futures.items()}
+
+
 def run_pipeline(in_path: str,
                  text_col_pref=("Full text (EN)", "Combined Text (EN)"),
+                 batch_max_tokens: int = BATCH_MAX_TOKENS,
+                 batch_max_items: int = BATCH_MAX_ITEMS,
+                 concurrency: int = 1,
+                 rpm: int = RPM_LIMIT,
+                 tpm: int = TPM_LIMIT,
+                 cache_path: str | None = None,
+                 dedup_threshold: float | None = DEDUP_THRESHOLD,
+                 rule_threshold: float | None = None,
+                 streaming: bool = False,
+                 chunk_rows: int | None = None,
+                 out_format: str = "xlsx",
+                 excel_export: bool = False,
+                 checkpoint: bool = True,
+                 batch_api: bool = False,
+                 batch_poll_seconds: float = BATCH_POLL_SECONDS,
+                 metrics: bool = True,
+                 local_model_path: str | None = None,
+                 local_threshold: float = LOCAL_THRESHOLD,
+                 parallel_sheets: int = 1,
+                 prior_output=None,
                  verbose: bool = True) -> str:
-    xl = open_excel_file(in_path)
-    processed = {}
+    """
+    in_path: .xlsx workbook or .parquet hand-off from scraper.py.
+    streaming=True reads each sheet in read-only mode and writes it as soon as it is done
+    (write-only workbook), so peak memory is one sheet - or one chunk_rows chunk of it.
+    out_format="parquet" writes one Parquet file (SHEET_COLUMN per row); excel_export=True
+    additionally renders it to .xlsx as a final presentation step.
+    cache_path (opt-in, e.g. CACHE_PATH): SQLite label cache shared across runs; cached texts
+    are not sent again.
+    rule_threshold (opt-in, e.g. RULE_THRESHOLD): rows rule_classify() labels with at least this
+    confidence skip the LLM (Label Status "rule").
+    checkpoint=True journals every finished batch to <output>.journal.jsonl; rerunning after a
+    crash resumes from there instead of re-classifying (and re-paying for) finished work.
+    batch_api=True sends everything the local stages cannot answer as one offline Batch API job
+    (cheaper, no interactive latency), then builds the output from its results.
+    metrics=True writes per-batch / per-stage records to <output>.metrics.jsonl and prints a
+    summary (tokens, p50/p95 latency, dropped items, estimated cost) at the end.
+    local_model_path: a model from train_local_classifier(); rows it labels with confidence
+    >= local_threshold skip the LLM (local_threshold=0 -> fully offline).
+    parallel_sheets > 1 works on that many sheets at once (see process_sheets_parallel);
+    output sheet order is still the input order.
+    prior_output: last run's *_classified_ai output(s); posts with the same URL and text keep
+    their labels (Label Status "reused"), only new or edited posts are classified.
+    """
+    if out_format not in ("xlsx", "parquet"):
+        raise ValueError(f"Unsupported out_format '{out_format}'. Use 'xlsx' or 'parquet'")
+    if streaming and (is_parquet(in_path) or out_format != "xlsx"):
+        raise ValueError("streaming mode reads and writes .xlsx; Parquet runs are already column-fast")
+    if streaming and parallel_sheets > 1:
+        raise ValueError("streaming mode keeps one sheet in memory; parallel_sheets needs several")
+    if streaming:
+        load, sheet_names = None, excel_sheet_names(in_path)
+    else:
+        sheet_names, load = open_input(in_path)
+    limiter = RateLimiter(rpm, tpm)  # one quota shared by every sheet of the run
+    cache = LabelCache(cache_path) if cache_path else None
+    out_path = os.path.splitext(in_path)[0] + "_classified_ai" + (".parquet" if out_format == "parquet" else ".xlsx")
+    journal = CheckpointJournal(os.path.splitext(out_path)[0] + ".journal.jsonl") if checkpoint else None
+    recorder = MetricsRecorder(os.path.splitext(out_path)[0] + ".metrics.jsonl") if metrics else None
+    local_model = LocalClassifier.load(local_model_path) if local_model_path else None
+    prior = PriorLabels(prior_output, text_col_pref, verbose=verbose) if prior_output else None
+
+    runner = None
+
+    def classify_sheet(sheet, verbose=verbose, recorder=recorder):
+        def classify(texts, authors, keys=None):
+            return classify_texts(texts, authors=authors, post_keys=keys, prior=prior,
+                                  rule_threshold=rule_threshold, cache=cache,
+                                  dedup_threshold=dedup_threshold, journal=journal, sheet=sheet,
+                                  runner=runner, local_model=local_model, local_threshold=local_threshold,
+                                  metrics=recorder, verbose=verbose,
+                                  max_tokens=batch_max_tokens, max_items=batch_max_items,
+                                  concurrency=concurrency, limiter=limiter)
+        return classify
 
-    total_sheets = len(xl.sheet_names)
+    total_sheets = len(sheet_names)
     if verbose:
         print(f"📘 Input file: {in_path}")
-        print(f"📄 Sheets: {total_sheets} -> {', '.join(xl.sheet_names)}")
+        print(f"📄 Sheets: {total_sheets} -> {', '.join(sheet_names)}")
         print(f"⭐ Samsung Stars loaded (canon): {len(SAMSUNG_STARS)}")
+        if journal is not None and len(journal):
+            print(f"♻️ Resuming: {len(journal)} labels in checkpoint {journal.path}")
 
     t0 = time.time()
 
-    for idx, sh in enumerate(xl.sheet_names, start=1):
-        t_sheet = time.time()
-        df = xl.parse(sh)
-        n_rows = len(df)
+    if batch_api:
+        # pass 1: run the local stages over every sheet and collect what still needs the model
+        job = BatchApiJob(os.path.splitext(out_path)[0], poll_seconds=batch_poll_seconds)
+        runner = job.collect
+        if streaming:
+            frames = ((sh, df) for sh, df, _ in iter_sheet_frames(in_path, chunk_rows=chunk_rows))
+        else:
+            names1, load1 = open_input(in_path)
+            frames = ((sh, load1(sh)) for sh in names1)
+        for sh, df in frames:
+            texts, authors, keys, _ = prepare_sheet(df, text_col_pref)
+            classify_sheet(sh, verbose=False)(texts, authors, keys)
+            del df
+        job.run(verbose=verbose)
+        # pass 2: labels now come from the job (and journal / cache), no API calls;
+        # pass 1 already recorded the stage metrics
+        runner = job.answer
+        classify_sheet = partial(classify_sheet, recorder=None)
 
+    if streaming:
         if verbose:
-            print(f"\n[{idx}/{total_sheets}] ▶ Sheet '{sh}' ({n_rows} rows)")
-
-        # Text column selection
-        text_col = next((c for c in text_col_pref if c in df.columns), None)
-        if not text_col:
-            # attempt build Combined Text (EN)
-            title_col = next((c for c in df.columns if "title" in c.lower()), None)
-            body_col  = next((c for c in df.columns if any(k in c.lower() for k in ["full text","snippet","content","body"])), None)
-            df["Combined Text (EN)"] = df.apply(
-                lambda r: " ".join([s for s in [str(r.get(title_col,"")), str(r.get(body_col,""))] if str(s).strip()]).strip(),
-                axis=1
-            )
-            text_col = "Combined Text (EN)"
-
-        texts = df[text_col].fillna("").astype(str).tolist()
+            print(f"💾 Streaming output → {out_path}")
+        writer = StreamingSheetWriter(out_path)
+        idx, t_sheet = 0, time.time()
+        for sh, df, first in iter_sheet_frames(in_path, chunk_rows=chunk_rows):
+            if first:
+                idx, t_sheet = idx + 1, time.time()
+            if verbose:
+                more = "" if first else " (next chunk)"
+                print(f"\n[{idx}/{total_sheets}] ▶ Sheet '{sh}'{more} ({len(df)} rows)")
+            writer.append(sh, process_sheet(df, classify_sheet(sh), text_col_pref, verbose=verbose))
+            del df  # only the current chunk is ever alive
+            if verbose:
+                print(f"✅ Written '{sh}' ({time.time()-t_sheet:.1f}s so far)")
+        writer.close()
+    else:
+        processed = {}
+        if parallel_sheets > 1:
+            if verbose:
+                print(f"\n⚡ Processing {total_sheets} sheets, {parallel_sheets} at a time")
+            processed = process_sheets_parallel(in_path, sheet_names, load, classify_sheet, text_col_pref,
+                                                workers=parallel_sheets, verbose=verbose)
+        else:
+            for idx, sh in enumerate(sheet_names, start=1):
+                t_sheet = time.time()
+                df = load(sh)
+                if verbose:
+                    print(f"\n[{idx}/{total_sheets}] ▶ Sheet '{sh}' ({len(df)} rows)")
+                processed[sh] = process_sheet(df, classify_sheet(sh), text_col_pref, verbose=verbose)
+                if verbose:
+                    print(f"✅ Finished '{sh}' in {time.time()-t_sheet:.1f}s")
 
-        # AI classify
-        if verbose:
-            print(f"   - Classifying via {MODEL} ... ", end="", flush=True)
-        t_cls = time.time()
-        rows = classify_batch_json_mode_ai(texts)
         if verbose:
-            print(f"done ({time.time()-t_cls:.1f}s)")
+            print(f"\n💾 Writing output → {out_path}")
+        if out_format == "parquet":
+            write_parquet_sheets(processed, out_path)
+            if excel_export:
+                xlsx_path = export_excel(out_path)
+                if verbose:
+                    print(f"📊 Excel export → {xlsx_path}")
+        else:
+            with pd.ExcelWriter(out_path, engine="openpyxl") as w:
+                for sh, df in processed.items():
+                    df.to_excel(w, sheet_name=_sheet_title(sh), index=False)
 
-        df["SS Product"]       = [r["ss_product"] for r in rows]
-        df["Product Category"] = [r["product_category"] for r in rows]
-        df["Sentiment"]        = [r["sentiment"] for r in rows]
-        df["Topic"]            = [r["topic"] for r in rows]
-        df["Subtopic"]         = [r["subtopic"] for r in rows]
-        df["Brand Terms"]      = ["; ".join(r["brand_terms"]) for r in rows]
+    if journal is not None:
+        journal.close(remove=True)  # output is on disk: nothing left to resume
 
-        # Posted By (AuthorName supported)
-        author_c = find_author_column(df)
+    if cache is not None:
+        evicted = cache.evict()
         if verbose:
-            print(f"   - Posted By from: {author_c if author_c else '(none -> Member)'}")
-        df["Posted By"] = df[author_c].fillna("").astype(str).apply(classify_posted_by) if author_c else "Member"
-
-        # Replied (Y/N)
-        replies_c = find_replies_column(df)
-        if replies_c:
-            def replied_flag(v):
-                try:
-                    return "N" if float(v) == 0 else "Y"
-                except Exception:
-                    return "N"
-            df["Replied (Y/N)"] = df[replies_c].apply(replied_flag)
-            if verbose:
-                zero = (pd.to_numeric(df[replies_c], errors="coerce").fillna(0) == 0).sum()
-                print(f"   - Replied (Y/N) from '{replies_c}' (zero: {zero})")
-        else:
-            df["Replied (Y/N)"] = "N"
-            if verbose:
-                print("   - Replied (Y/N): replies column not found -> default N")
+            print(f"🗃 Label cache: {cache.stats()} | evicted {evicted}")
+        cache.close()
 
-        processed[sh] = df
+    if recorder is not None:
+        summ = recorder.close()
         if verbose:
-            print(f"✅ Finished '{sh}' in {time.time()-t_sheet:.1f}s")
-
-    out_path = os.path.splitext(in_path)[0] + "_classified_ai.xlsx"
-    if verbose:
-        print(f"\n💾 Writing output → {out_path}")
-
-    with pd.ExcelWriter(out_path, engine="openpyxl") as w:
-        for sh, df in processed.items():
-            df.to_excel(w, sheet_name=sh, index=False)
+            p50 = "-" if summ["latency_p50_s"] is None else f'{summ["latency_p50_s"]:.2f}s'
+            p95 = "-" if summ["latency_p95_s"] is None else f'{summ["latency_p95_s"]:.2f}s'
+            retries = "-" if summ["retries"] is None else summ["retries"]
+            print(f"📈 API: {summ['batches']} batches, {summ['items_requested']} items "
+                  f"({summ['items_repaired']} repaired locally, {summ['items_requeried']} re-asked, "
+                  f"{summ['items_defaulted']} defaulted), {retries} retries | "
+                  f"tokens in/out {summ['prompt_tokens']}/{summ['completion_tokens']} | "
+                  f"latency p50 {p50} p95 {p95} | est. ${summ['est_cost_usd']:.4f}")
+            print(f"   Saved locally: prior output {summ['prior_saved']}, rules {summ['rules_saved']}, "
+                  f"dedup {summ['dedup_saved']}, "
+                  f"checkpoint {summ['checkpoint_saved']}, cache {summ['cache_saved']}, "
+                  f"local model {summ['local_saved']} → {recorder.path}")
 
     if verbose:
         print(f"🎉 Done in {time.time()-t0:.1f}s")
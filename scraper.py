@@ -4,10 +4,13 @@
 #                    SME (Malaysia), SESP (Singapore), SEPCO (Philippines), SENZ (New Zealand)
 # =============================================================
 
-import os, re, time, math
+import os, re, json, time, math, copy, queue, random, asyncio, threading
 import pandas as pd
-from urllib.parse import urljoin
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import httpx
+from lxml import html as lxml_html
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -15,6 +18,7 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 
 # ---------------------------
@@ -23,12 +27,33 @@ from webdriver_manager.chrome import ChromeDriverManager
 MARKET = "SEIN"          # SEIN / SEAU / TSE / SME / SESP / SEPCO / SENZ
 START_PAGE = 51          # for single page, set START_PAGE = STOP_PAGE
 STOP_PAGE  = 55
+# Several markets in one run (shared HTTP crawler + Chrome pools, one combined output split by Sub):
+#   {"SEIN": (1, 5), "SEAU": (1, 3)} or ["SEIN", "SEAU"] (START_PAGE..STOP_PAGE each); None = MARKET only
+MARKETS_TO_CRAWL = None
 HEADLESS   = True
 N_WORKERS  = 4
+DRIVER_RECYCLE_PAGES = 50  # a worker's Chrome is replaced after this many pages (memory creep)
+LISTING_WORKERS = 3        # Chrome drivers for listing pages (only those the HTTP path cannot read)
+TILE_EXTRACT = "js"        # Chrome listing pages: "js" (one script call per page) or "python" (per-field lookups)
+DETAIL_EXTRACT = "js"      # Chrome detail pages: "js" (one script call per page) or "python" (per-reply lookups)
+
+# Listing + detail pages: "http" (async HTTP + lxml, Chrome only for pages the served HTML
+#                         does not cover) or "selenium" (Chrome for every page)
+LISTING_MODE = "http"
+DETAIL_MODE = "http"
+HTTP_TIMEOUT = 15
+HTTP_CONCURRENCY = 16    # requests in flight per host
+HTTP_RPS = 8.0           # request starts per second per host (None = unlimited)
+HTTP_RETRIES = 4         # retries on 429 / 5xx / network errors
+HTTP_BACKOFF = 0.5       # base seconds of the jittered exponential backoff
 
 # Optional: keep AuthorRaw for QA
 KEEP_AUTHOR_RAW = True
 
+# Output: "xlsx" (default) or "parquet" (fast columnar hand-off to llmclassifier.py)
+OUTPUT_FORMAT = "xlsx"
+EXCEL_EXPORT  = False    # parquet mode only: also write the .xlsx for people to open
+
 # ---------------------------
 # MARKET CONFIG
 # ---------------------------
@@ -95,6 +120,9 @@ MARKETS = {
 
 if MARKET not in MARKETS:
     raise ValueError(f"Unsupported MARKET={MARKET}. Choose from: {', '.join(MARKETS)}")
+for _m in (MARKETS_TO_CRAWL or ()):
+    if _m not in MARKETS:
+        raise ValueError(f"Unsupported market {_m} in MARKETS_TO_CRAWL. Choose from: {', '.join(MARKETS)}")
 
 SUB_CODE = MARKETS[MARKET]["sub_code"]
 
@@ -122,16 +150,44 @@ def get_desktop_path() -> str:
     os.makedirs(fallback, exist_ok=True)
     return fallback
 
+if OUTPUT_FORMAT not in ("xlsx", "parquet"):
+    raise ValueError(f"Unsupported OUTPUT_FORMAT={OUTPUT_FORMAT}. Choose xlsx or parquet")
+for _name, _mode in (("LISTING_MODE", LISTING_MODE), ("DETAIL_MODE", DETAIL_MODE)):
+    if _mode not in ("http", "selenium"):
+        raise ValueError(f"Unsupported {_name}={_mode}. Choose http or selenium")
+for _name, _mode in (("TILE_EXTRACT", TILE_EXTRACT), ("DETAIL_EXTRACT", DETAIL_EXTRACT)):
+    if _mode not in ("js", "python"):
+        raise ValueError(f"Unsupported {_name}={_mode}. Choose js or python")
+
 desktop = get_desktop_path()
 if START_PAGE == STOP_PAGE:
-    OUTFILENAME = f"samsung_members_{MARKET.lower()}_page{START_PAGE:02}.xlsx"
+    OUTFILENAME = f"samsung_members_{MARKET.lower()}_page{START_PAGE:02}.{OUTPUT_FORMAT}"
 else:
-    OUTFILENAME = f"samsung_members_{MARKET.lower()}_page{START_PAGE:02}to{STOP_PAGE:02}.xlsx"
+    OUTFILENAME = f"samsung_members_{MARKET.lower()}_page{START_PAGE:02}to{STOP_PAGE:02}.{OUTPUT_FORMAT}"
 OUTFILE = os.path.join(desktop, OUTFILENAME)
 
+# Stable output schema (column order + dtypes) for the Parquet hand-off
+SCRAPER_SCHEMA = {
+    "Title": "string", "URL": "string", "AuthorName": "string",
+    "Date": "string", "Time": "string", "Category": "string",
+    "Likes": "Int64", "Comments": "Int64", "Views": "Int64",
+    "Snippet": "string", "ListingPage": "Int64", "AuthorRaw": "string",
+    "Month": "string", "Sub": "string",
+    "FullText": "string", "Replies": "string", "RepliesCount": "Int64", "ReplyRecords": "string",
+}
+
+def apply_scraper_schema(frame: pd.DataFrame) -> pd.DataFrame:
+    """Same columns and dtypes on every run, even when nothing was scraped."""
+    cols = [c for c in SCRAPER_SCHEMA if KEEP_AUTHOR_RAW or c != "AuthorRaw"]
+    frame = frame.reindex(columns=cols)
+    return frame.astype({c: SCRAPER_SCHEMA[c] for c in cols})
+
 # ---------------------------
 # Chrome setup (robust + eager)
 # ---------------------------
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36")
+
 def configure_chrome_options(headless: bool = True) -> Options:
     opts = Options()
 
@@ -154,10 +210,7 @@ def configure_chrome_options(headless: bool = True) -> Options:
     opts.add_argument("--disable-notifications")
     opts.add_argument("--disable-extensions")
     opts.add_argument("--blink-settings=imagesEnabled=false")
-    opts.add_argument(
-        "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
-    )
+    opts.add_argument(f"--user-agent={USER_AGENT}")
     opts.add_experimental_option("prefs", {
         "profile.managed_default_content_settings.images": 2
     })
@@ -166,14 +219,18 @@ def configure_chrome_options(headless: bool = True) -> Options:
     opts.page_load_strategy = "eager"
     return opts
 
-# Primary listing driver
-options = configure_chrome_options(HEADLESS)
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
-WAIT = WebDriverWait(driver, 20)
+# chromedriver is resolved (downloaded if needed) once, on first use, and shared by every driver;
+# importing this module starts no browser
+_CHROMEDRIVER_PATH = None
+
+def chromedriver_path() -> str:
+    global _CHROMEDRIVER_PATH
+    if _CHROMEDRIVER_PATH is None:
+        _CHROMEDRIVER_PATH = ChromeDriverManager().install()
+    return _CHROMEDRIVER_PATH
 
-# Reuse chromedriver path for workers
-CHROMEDRIVER_PATH = service.path
+def new_listing_driver(headless: bool = HEADLESS):
+    return webdriver.Chrome(service=Service(chromedriver_path()), options=configure_chrome_options(headless))
 
 # ---------------------------
 # Helpers
@@ -212,7 +269,14 @@ def force_full_timestamps(_driver):
     except Exception:
         pass
 
-def wait_for_tiles_or_retry(urls_for_page):
+TILE_SELECTORS = [
+    "article.samsung-message-tile",
+    "li.samsung-message-tile",
+    "div.samsung-message-tile",
+    ".lia-message-list .samsung-message-tile",
+]
+
+def wait_for_tiles_or_retry(driver, urls_for_page):
     """
     Try multiple listing URLs (ct-p / bd-p) until tiles are detected.
     Returns (tile_selector, landed_url)
@@ -226,15 +290,8 @@ def wait_for_tiles_or_retry(urls_for_page):
             driver.execute_script("window.scrollBy(0, 900)")
             time.sleep(0.2)
 
-        selectors = [
-            "article.samsung-message-tile",
-            "li.samsung-message-tile",
-            "div.samsung-message-tile",
-            ".lia-message-list .samsung-message-tile",
-        ]
-
         def any_tiles(drv):
-            for sel in selectors:
+            for sel in TILE_SELECTORS:
                 if drv.find_elements(By.CSS_SELECTOR, sel):
                     return sel
             return False
@@ -284,6 +341,25 @@ def parse_author_field(author_raw: str):
         category = lines[-1] if len(lines) > 1 else ""
     return pd.Series([author, date_part, time_part, category])
 
+AUTHOR_SELECTORS = [
+    "a.login",
+    "a.lia-user-name-link",
+    "a.username",
+    "a[rel='author']",
+    "a[href*='/t5/user/']",
+    "a[href*='/user/viewprofilepage']",
+]
+
+def split_stamp(stamp: str):
+    """'MM-dd-yyyy hh:mm AM' -> (date, time); date only -> (date, ""); relative times -> ("", "")."""
+    m = re.search(r"(\d{2}-\d{2}-\d{4})\s+(\d{2}:\d{2}\s+(?:AM|PM))", stamp, flags=re.I)
+    if m:
+        return m.group(1), m.group(2)
+    # if only absolute date exists
+    m2 = re.search(r"(\d{2}-\d{2}-\d{4})", stamp)
+    # relative times ("6m ago", "3h ago", "2 days ago") intentionally left blank
+    return (m2.group(1) if m2 else ""), ""
+
 def extract_author_meta_from_tile(tile):
     """
     DOM-first extractor:
@@ -301,15 +377,7 @@ def extract_author_meta_from_tile(tile):
         author_raw = (ablock.text or "").strip()
 
         # 1) AuthorName (DOM-first)
-        author_selectors = [
-            "a.login",
-            "a.lia-user-name-link",
-            "a.username",
-            "a[rel='author']",
-            "a[href*='/t5/user/']",
-            "a[href*='/user/viewprofilepage']",
-        ]
-        for sel in author_selectors:
+        for sel in AUTHOR_SELECTORS:
             try:
                 for el in ablock.find_elements(By.CSS_SELECTOR, sel):
                     txt = (el.text or "").strip()
@@ -342,15 +410,7 @@ def extract_author_meta_from_tile(tile):
         if not stamp:
             stamp = author_raw
 
-        m = re.search(r"(\d{2}-\d{2}-\d{4})\s+(\d{2}:\d{2}\s+(?:AM|PM))", stamp, flags=re.I)
-        if m:
-            date_part, time_part = m.group(1), m.group(2)
-        else:
-            # if only absolute date exists
-            m2 = re.search(r"(\d{2}-\d{2}-\d{4})", stamp)
-            if m2:
-                date_part = m2.group(1)
-            # relative times ("6m ago", "3h ago", "2 days ago") intentionally left blank
+        date_part, time_part = split_stamp(stamp)
 
         # 3) Category = last non-user link in div.author
         try:
@@ -393,75 +453,156 @@ def month_from_date(date_str: str) -> str:
 # ---------------------------
 # Detail page fetch (single-driver function)
 # ---------------------------
+# Shared by the Selenium and the HTTP (lxml) extractors
+DETAIL_READY_SELECTOR = "#bodyDisplay, #messageView2, .lia-message-view-wrapper"
+READ_MORE_SELECTOR = "a.lia-message-read-more, a.lia-truncate-read-more, button[aria-controls*='truncate']"
+POST_BODY_SELECTOR = (
+    "#bodyDisplay .lia-message-body-content, "
+    "#messageView2 .lia-message-body-content, "
+    ".lia-message-view-wrapper .lia-message-body-content"
+)
+REPLY_BODY_SELECTOR = (
+    ".linear-message-list .lia-message-view:not(.first-message) .lia-message-body-content, "
+    ".custom-reply .lia-message-body-content"
+)
+MAIN_CONTENT_SELECTOR = ".lia-quilt-column-main-content, .lia-quilt-row-main"
+
+REPLY_VIEW_CLASSES = ("lia-message-view", "custom-reply")  # a reply body's enclosing message
+REPLY_AUTHOR_SELECTOR = ".lia-message-author-username, a.lia-user-name-link, a.login"
+REPLY_TIME_SELECTOR = "abbr[title], time, .DateTime"
+
+# Detail results: (full_post_text, replies_text_concat, replies_count, reply_records), where
+# reply_records = [{"text", "author", "timestamp"}, ...] in page order
+DETAIL_COLUMNS = ("FullText", "Replies", "RepliesCount", "ReplyRecords")
+EMPTY_DETAIL = ("", "", 0, [])
+
+def clean_lines(text: str) -> str:
+    return "\n".join(ln.strip() for ln in str(text or "").splitlines() if ln.strip())
+
+def detail_result(main_txt: str, replies) -> tuple:
+    """
+    Main body + [{"text", "author", "timestamp"}] -> detail result (empty replies dropped).
+    The body is line-cleaned; reply texts are only stripped, as Replies has always been.
+    """
+    records = []
+    for r in replies:
+        text = str(r.get("text") or "").strip()
+        if text:
+            records.append({"text": text, "author": (r.get("author") or "").strip(),
+                            "timestamp": (r.get("timestamp") or "").replace("\u200e", "").strip()})
+    return clean_lines(main_txt), " || ".join(r["text"] for r in records), len(records), records
+
+def detail_row(res) -> dict:
+    """Detail result -> the scraper's detail columns (reply records as a JSON string)."""
+    main_txt, replies_txt, n, records = res
+    return {"FullText": main_txt, "Replies": replies_txt, "RepliesCount": n,
+            "ReplyRecords": json.dumps(records, ensure_ascii=False)}
+
+# Expand truncation, then read the main body and every reply (text, author, timestamp) in one
+# async script call instead of one chromedriver round trip per reply.
+DETAIL_EXTRACT_JS = r"""
+const [sel, done] = [arguments[0], arguments[arguments.length - 1]];
+const txt = el => ((el && el.innerText) || "").trim();
+document.querySelectorAll(sel.readMore).forEach(el => { try { el.click(); } catch (e) {} });
+setTimeout(() => {
+  const body = document.querySelector(sel.postBody);
+  const replies = Array.from(document.querySelectorAll(sel.replyBody)).map(el => {
+    let view = el.parentElement;
+    while (view && !sel.viewClasses.some(c => view.classList.contains(c))) view = view.parentElement;
+    const stamp = view && view.querySelector(sel.time);
+    return {
+      text: txt(el),
+      author: txt(view && view.querySelector(sel.author)),
+      timestamp: stamp ? (stamp.getAttribute("title") || txt(stamp)) : "",
+    };
+  });
+  done({main: txt(body), replies: replies});
+}, sel.expandMs);
+"""
+
+def extract_detail_js(drv) -> tuple:
+    res = drv.execute_async_script(DETAIL_EXTRACT_JS, {
+        "readMore": READ_MORE_SELECTOR, "postBody": POST_BODY_SELECTOR, "replyBody": REPLY_BODY_SELECTOR,
+        "viewClasses": list(REPLY_VIEW_CLASSES), "author": REPLY_AUTHOR_SELECTOR, "time": REPLY_TIME_SELECTOR,
+        "expandMs": 150,
+    })
+    return detail_result(res.get("main") or "", res.get("replies") or [])
+
+def _reply_meta_selenium(body_el) -> dict:
+    """Author + timestamp of the message a reply body belongs to (per-element lookups)."""
+    meta = {"author": "", "timestamp": ""}
+    try:
+        cond = " or ".join(f"contains(concat(' ', @class, ' '), ' {c} ')" for c in REPLY_VIEW_CLASSES)
+        view = body_el.find_element(By.XPATH, f"./ancestor::*[{cond}][1]")
+    except Exception:
+        return meta
+    try:
+        meta["author"] = view.find_element(By.CSS_SELECTOR, REPLY_AUTHOR_SELECTOR).get_attribute("innerText") or ""
+    except Exception:
+        pass
+    try:
+        t = view.find_element(By.CSS_SELECTOR, REPLY_TIME_SELECTOR)
+        meta["timestamp"] = t.get_attribute("title") or t.get_attribute("innerText") or ""
+    except Exception:
+        pass
+    return meta
+
+def extract_detail_python(drv) -> tuple:
+    # Expand truncation if present (2x max for speed)
+    for _ in range(2):
+        try:
+            more = drv.find_element(By.CSS_SELECTOR, READ_MORE_SELECTOR)
+            drv.execute_script("arguments[0].click();", more)
+            time.sleep(0.15)
+        except Exception:
+            break
+
+    # Main post body (first body-content block)
+    post_blocks = drv.find_elements(By.CSS_SELECTOR, POST_BODY_SELECTOR)
+    main_txt = (post_blocks[0].get_attribute("innerText") or "") if post_blocks else ""
+
+    # Replies (exclude first message)
+    replies = []
+    for r in drv.find_elements(By.CSS_SELECTOR, REPLY_BODY_SELECTOR):
+        t = r.get_attribute("innerText") or ""
+        if t.strip():
+            replies.append({"text": t, **_reply_meta_selenium(r)})
+    return detail_result(main_txt, replies)
+
 def fetch_post_and_replies_with_driver(drv, url: str):
     """
-    Returns (full_post_text, replies_text_concat, replies_count)
+    Returns (full_post_text, replies_text_concat, replies_count, reply_records)
     """
     try:
         drv.get(url)
         accept_cookies_if_present(drv)
 
         WebDriverWait(drv, 8).until(
-            EC.presence_of_element_located((
-                By.CSS_SELECTOR, "#bodyDisplay, #messageView2, .lia-message-view-wrapper"
-            ))
+            EC.presence_of_element_located((By.CSS_SELECTOR, DETAIL_READY_SELECTOR))
         )
 
-        # Expand truncation if present (2x max for speed)
-        for _ in range(2):
+        if DETAIL_EXTRACT == "js":
             try:
-                more = drv.find_element(
-                    By.CSS_SELECTOR,
-                    "a.lia-message-read-more, a.lia-truncate-read-more, button[aria-controls*='truncate']"
-                )
-                drv.execute_script("arguments[0].click();", more)
-                time.sleep(0.15)
-            except Exception:
-                break
-
-        # Main post body (first body-content block)
-        post_blocks = drv.find_elements(
-            By.CSS_SELECTOR,
-            "#bodyDisplay .lia-message-body-content, "
-            "#messageView2 .lia-message-body-content, "
-            ".lia-message-view-wrapper .lia-message-body-content"
-        )
-        main_txt = ""
-        if post_blocks:
-            t = (post_blocks[0].get_attribute("innerText") or "").strip()
-            if t:
-                main_txt = "\n".join(ln.strip() for ln in t.splitlines() if ln.strip())
-
-        # Replies (exclude first message)
-        reply_blocks = drv.find_elements(
-            By.CSS_SELECTOR,
-            ".linear-message-list .lia-message-view:not(.first-message) .lia-message-body-content, "
-            ".custom-reply .lia-message-body-content"
-        )
-        replies = []
-        for r in reply_blocks:
-            t = (r.get_attribute("innerText") or "").strip()
-            if t:
-                replies.append(t)
-
-        return main_txt, " || ".join(replies), len(replies)
+                return extract_detail_js(drv)
+            except Exception as e:
+                print("JS detail extraction failed, using the Python lookups:", e)
+        return extract_detail_python(drv)
 
     except Exception:
         # Defensive fallback
         try:
-            alt = drv.find_element(By.CSS_SELECTOR, ".lia-quilt-column-main-content, .lia-quilt-row-main")
-            t = (alt.get_attribute("innerText") or "").strip()
-            t = "\n".join(ln.strip() for ln in t.splitlines() if ln.strip())
-            return t[:20000], "", 0
+            alt = drv.find_element(By.CSS_SELECTOR, MAIN_CONTENT_SELECTOR)
+            t = clean_lines(alt.get_attribute("innerText"))
+            return t[:20000], "", 0, []
         except Exception:
-            return "", "", 0
+            return EMPTY_DETAIL
 
 # ---------------------------
 # Worker driver (parallel)
 # ---------------------------
 def new_worker_driver():
     opts = configure_chrome_options(True)  # workers always headless
-    d = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=opts)
+    d = webdriver.Chrome(service=Service(chromedriver_path()), options=opts)
 
     # Block heavy resources (best-effort)
     try:
@@ -480,166 +621,863 @@ def new_worker_driver():
     d.set_page_load_timeout(15)
     return d
 
-def worker(urls_chunk):
-    drv = new_worker_driver()
-    out = {}
+def driver_alive(drv) -> bool:
     try:
-        for u in urls_chunk:
-            out[u] = fetch_post_and_replies_with_driver(drv, u)
-    finally:
+        drv.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+class DriverPool:
+    """
+    Warm Chrome drivers shared by threads. fetch(url) borrows an idle driver (starting one if none is
+    idle, at most `size` alive); a driver is quit and replaced after `recycle_after` pages, or when a
+    page comes back empty and the driver no longer responds (that URL is then retried once).
+    run(urls) drains a shared queue with `size` threads, so a slow post only holds up its own driver.
+    """
+    def __init__(self, size: int = N_WORKERS, recycle_after: int = DRIVER_RECYCLE_PAGES,
+                 make_driver=new_worker_driver):
+        self.size, self.recycle_after, self.make_driver = size, recycle_after, make_driver
+        self.stats = {"started": 0, "recycled": 0, "crashed": 0}
+        self._idle = []  # [driver, pages served]
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _quit(self, drv) -> None:
         try:
             drv.quit()
         except Exception:
             pass
+
+    def _acquire(self) -> list:
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            drv = self.make_driver()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.stats["started"] += 1
+        return [drv, 0]
+
+    def _release(self, slot: list, alive: bool) -> None:
+        drv, pages = slot
+        if not alive or pages >= self.recycle_after:
+            self._quit(drv)
+            with self._lock:
+                self.stats["recycled" if alive else "crashed"] += 1
+        else:
+            with self._lock:
+                self._idle.append(slot)
+        self._slots.release()
+
+    def fetch(self, url, extract=None, empty=EMPTY_DETAIL):
+        """
+        extract(driver, url) on a pooled driver (default: detail page ->
+        (full_post_text, replies_text_concat, replies_count, reply_records)); `empty` is its nothing-found result.
+        """
+        extract = extract or fetch_post_and_replies_with_driver
+        res = empty
+        for _ in range(2):
+            slot = self._acquire()
+            try:
+                res = extract(slot[0], url)
+            except Exception:
+                res = empty
+            slot[1] += 1
+            alive = res != empty or driver_alive(slot[0])
+            self._release(slot, alive)
+            if alive:
+                break
+        return res
+
+    def run(self, urls, extract=None, verbose: bool = True) -> dict:
+        """-> {url: fetch(url)}; `size` threads pull URLs from one queue until it is empty."""
+        todo = queue.Queue()
+        for u in urls:
+            todo.put(u)
+        out, done, t0 = {}, 0, time.perf_counter()
+
+        def work():
+            nonlocal done
+            while True:
+                try:
+                    u = todo.get_nowait()
+                except queue.Empty:
+                    return
+                t = time.perf_counter()
+                try:
+                    res = self.fetch(u, extract)
+                except Exception as e:  # no driver could be started
+                    res = EMPTY_DETAIL
+                    print(f"× Driver start failed for {u}: {e}")
+                with self._lock:
+                    out[u] = res
+                    done += 1
+                    n = done
+                if verbose:
+                    print(f"  ...detail {n}/{len(urls)} ({time.perf_counter() - t:.1f}s) {u}")
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(min(self.size, len(urls)))]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        if verbose:
+            print(f"  Drivers: {self.stats['started']} started | {self.stats['recycled']} recycled | "
+                  f"{self.stats['crashed']} crashed | {time.perf_counter() - t0:.1f}s")
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for drv, _ in idle:
+            self._quit(drv)
+
+# ---------------------------
+# Detail page fetch (HTTP fast path)
+# ---------------------------
+# Post pages render the message bodies server-side: a plain GET + lxml with the same selectors
+# reads them without a browser. Chrome is only started for pages where no body is found.
+BLOCK_TAGS = ("p", "div", "li", "ul", "ol", "blockquote", "pre", "table", "tr",
+              "h1", "h2", "h3", "h4", "h5", "h6")
+
+def new_http_client(max_connections: int = N_WORKERS * 2) -> httpx.Client:
+    """Keep-alive connection pool; thread-safe, so one client serves every detail worker."""
+    return httpx.Client(
+        headers={"User-Agent": USER_AGENT, "Accept-Language": "en"},
+        timeout=HTTP_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+def html_inner_text(el) -> str:
+    """Rough innerText for an lxml element: source whitespace collapses, <br>/block boundaries become newlines."""
+    if el.tag in ("script", "style", "noscript"):
+        return ""
+    for bad in list(el.iter("script", "style", "noscript")):
+        bad.drop_tree()
+    for node in el.iter():
+        if node.tag != "pre":
+            node.text = re.sub(r"\s+", " ", node.text) if node.text else node.text
+        if node is not el:
+            node.tail = re.sub(r"\s+", " ", node.tail) if node.tail else node.tail
+    for br in el.iter("br"):
+        br.tail = "\n" + (br.tail or "")
+    for blk in el.iter(*BLOCK_TAGS):
+        blk.text = "\n" + (blk.text or "")
+        blk.tail = "\n" + (blk.tail or "")
+    t = el.text_content().replace(NBSP, " ")
+    return "\n".join(ln.strip() for ln in t.splitlines() if ln.strip())
+
+class LxmlElement:
+    """The slice of Selenium's WebElement API the tile parsers use, over a served-HTML element."""
+    def __init__(self, el, page_url: str = BASE):
+        self.el, self.page_url = el, page_url
+
+    @property
+    def text(self) -> str:
+        return html_inner_text(copy.deepcopy(self.el))
+
+    def get_attribute(self, name: str):
+        v = self.el.get(name)
+        if v and name in ("href", "src"):
+            v = urljoin(self.page_url, v)  # like the browser's resolved property
+        return v
+
+    def find_elements(self, by, selector: str) -> list:
+        return [LxmlElement(e, self.page_url) for e in self.el.cssselect(selector)]
+
+    def find_element(self, by, selector: str):
+        found = self.el.cssselect(selector)
+        if not found:
+            raise NoSuchElementException(selector)
+        return LxmlElement(found[0], self.page_url)
+
+def parse_detail_html(page_html: str):
+    """
+    Returns (full_post_text, replies_text_concat, replies_count, reply_records) like
+    fetch_post_and_replies_with_driver, or None when the page has no message body (client-rendered
+    page, error page, login wall). Truncation ("read more") is CSS-only in the served HTML, so
+    nothing needs expanding.
+    """
+    try:
+        doc = lxml_html.fromstring(page_html)
+    except Exception:
+        return None
+    post_blocks = doc.cssselect(POST_BODY_SELECTOR)
+    main_txt = html_inner_text(post_blocks[0]) if post_blocks else ""
+    if not main_txt:
+        return None
+    replies = []
+    for body in doc.cssselect(REPLY_BODY_SELECTOR):
+        rec = {"author": "", "timestamp": ""}
+        view = next((v for v in body.iterancestors()
+                     if set(v.get("class", "").split()) & set(REPLY_VIEW_CLASSES)), None)
+        if view is not None:
+            author = view.cssselect(REPLY_AUTHOR_SELECTOR)
+            stamp = view.cssselect(REPLY_TIME_SELECTOR)
+            rec["author"] = html_inner_text(copy.deepcopy(author[0])) if author else ""
+            if stamp:
+                rec["timestamp"] = stamp[0].get("title") or html_inner_text(copy.deepcopy(stamp[0]))
+        rec["text"] = html_inner_text(body)
+        replies.append(rec)
+    return detail_result(main_txt, replies)
+
+def fetch_post_and_replies_http(client: httpx.Client, url: str):
+    """parse_detail_html of the fetched page; None on HTTP errors or when no body is found."""
+    try:
+        r = client.get(url)
+        r.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    return parse_detail_html(r.text)
+
+_COUNTS_LOCK = threading.Lock()  # detail_fetcher counts are shared by every worker thread
+
+def detail_fetcher(mode: str = DETAIL_MODE, client: httpx.Client | None = None, counts: dict | None = None,
+                   pool: DriverPool | None = None):
+    """
+    One detail worker -> (fetch(url) -> detail result (see DETAIL_COLUMNS), close()).
+    mode "http" tries the HTTP fast path first (on client, or a client of its own); Selenium pages
+    go through pool (shared between workers, or a one-driver pool of its own), so Chrome is only
+    started for the first page that needs it.
+    counts (optional) is incremented per page: {"http": n, "selenium": n}.
+    """
+    own_client = client is None and mode == "http"
+    if own_client:
+        client = new_http_client(max_connections=2)
+    own_pool = pool is None
+    if own_pool:
+        pool = DriverPool(1)
+
+    def count(path: str) -> None:
+        if counts is not None:
+            with _COUNTS_LOCK:
+                counts[path] = counts.get(path, 0) + 1
+
+    def fetch(url: str):
+        if mode == "http":
+            got = fetch_post_and_replies_http(client, url)
+            if got is not None:
+                count("http")
+                return got
+        count("selenium")
+        return pool.fetch(url)
+
+    def close():
+        if own_pool:
+            pool.close()
+        if own_client:
+            client.close()
+
+    return fetch, close
+
+# ---------------------------
+# Async HTTP crawler (listing + detail pages)
+# ---------------------------
+# One event loop, one keep-alive connection pool: dozens of pages in flight on one core instead of
+# one Chrome per worker. Per host: at most `concurrency` requests in flight and `rps` request
+# starts per second; 429 / 5xx / network errors are retried with jittered exponential backoff
+# (Retry-After honoured, and it pauses the whole host).
+class AsyncCrawler:
+    def __init__(self, concurrency: int = HTTP_CONCURRENCY, rps: float | None = HTTP_RPS,
+                 retries: int = HTTP_RETRIES, backoff: float = HTTP_BACKOFF, timeout: float = HTTP_TIMEOUT):
+        self.concurrency, self.rps = concurrency, rps
+        self.retries, self.backoff, self.timeout = retries, backoff, timeout
+        self.stats = {"requests": 0, "retries": 0, "failed": 0}
+        self._sems = {}       # host -> asyncio.Semaphore
+        self._next_slot = {}  # host -> loop time of the next allowed request start
+        self.client = None
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT, "Accept-Language": "en"},
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=self.concurrency * 4),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+
+    async def _pace(self, host: str) -> None:
+        """Wait for this host's next request slot (no await between read and write: no lock needed)."""
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = start + (1.0 / self.rps if self.rps else 0.0)
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def get_text(self, url: str) -> str | None:
+        """Page body, or None (404 / other 4xx, or still failing after the retries)."""
+        host = urlsplit(url).netloc
+        sem = self._sems.setdefault(host, asyncio.Semaphore(self.concurrency))
+        for attempt in range(self.retries + 1):
+            wait = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            async with sem:
+                await self._pace(host)
+                self.stats["requests"] += 1
+                try:
+                    r = await self.client.get(url)
+                except httpx.TransportError:
+                    r = None
+            if r is not None:
+                if r.status_code == 200:
+                    return r.text
+                if r.status_code == 429:
+                    try:
+                        wait = max(wait, float(r.headers.get("retry-after") or 0))
+                    except ValueError:
+                        pass
+                    self._next_slot[host] = max(self._next_slot.get(host, 0.0),
+                                                asyncio.get_running_loop().time() + wait)
+                elif r.status_code < 500:
+                    break
+            if attempt < self.retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(wait)
+        self.stats["failed"] += 1
+        return None
+
+    async def fetch_details(self, urls, progress_every: int = 50) -> dict:
+        """-> {url: (full_post_text, replies_text_concat, replies_count, reply_records)} for pages with a served body."""
+        out, done = {}, 0
+
+        async def one(u):
+            nonlocal done
+            html = await self.get_text(u)
+            got = parse_detail_html(html) if html else None
+            if got is not None:
+                out[u] = got
+            done += 1
+            if done % progress_every == 0 or done == len(urls):
+                print(f"  ...detail progress (HTTP): {done}/{len(urls)}")
+
+        await asyncio.gather(*(one(u) for u in urls))
+        return out
+
+    async def fetch_listing_pages(self, jobs, base: str = BASE, on_page=None) -> dict:
+        """
+        jobs: (market, page) pairs, started in the given order.
+        -> {(market, page): (html, landed_url)} for pages where a listing candidate URL served tiles.
+        on_page(job, (html, landed_url) or None) is called as soon as each page is known.
+        """
+        out = {}
+
+        async def one(market, page):
+            try:
+                for url in listing_urls(market, page, base):
+                    html = await self.get_text(url)
+                    if html and listing_has_tiles(html):
+                        out[(market, page)] = (html, url)
+                        return
+            finally:
+                if on_page is not None:
+                    on_page((market, page), out.get((market, page)))
+
+        await asyncio.gather(*(one(m, p) for m, p in jobs))
+        return out
+
+def fetch_details_http(urls, **crawler_kw) -> dict:
+    """Sync wrapper: AsyncCrawler(**crawler_kw).fetch_details(urls)."""
+    async def run():
+        async with AsyncCrawler(**crawler_kw) as crawler:
+            return await crawler.fetch_details(urls), crawler.stats
+    out, stats = asyncio.run(run())
+    print(f"  HTTP: {stats['requests']} requests | {stats['retries']} retries | {stats['failed']} failed")
     return out
 
+def fetch_listing_http(jobs, base: str = BASE, **crawler_kw) -> dict:
+    """Sync wrapper: AsyncCrawler(**crawler_kw).fetch_listing_pages(jobs, base)."""
+    async def run():
+        async with AsyncCrawler(**crawler_kw) as crawler:
+            return await crawler.fetch_listing_pages(jobs, base)
+    return asyncio.run(run())
+
 # ---------------------------
-# MAIN — 1) Crawl listing pages and collect unique URLs
+# Listing page -> rows
 # ---------------------------
-all_rows = []
-seen_urls = set()
+def parse_listing_tile(post, page: int, seen_urls: set):
+    """One listing tile -> row dict, or None if it has no link or the URL was already seen."""
+    # Title + URL
+    a = post.find_element(By.CSS_SELECTOR, "h3 a")
+    title = (a.text or "").strip()
+    href = normalize_url(a.get_attribute("href") or "")
+
+    if not href or href in seen_urls:
+        return None
+    seen_urls.add(href)
+
+    # Snippet
+    try:
+        snippet = (post.find_element(By.CSS_SELECTOR, "div.content-wrapper").text or "").strip()
+    except Exception:
+        snippet = ""
 
-t0 = time.perf_counter()
+    # Author metadata (DOM-first + fallback)
+    meta = extract_author_meta_from_tile(post)
 
-for page in range(START_PAGE, STOP_PAGE + 1):
-    page_urls = MARKETS[MARKET]["listing_candidates"](page)
-    print(f"\n=== {MARKET} Listing page {page} ===")
+    # Counts
+    def get_int(css):
+        try:
+            txt = (post.find_element(By.CSS_SELECTOR, css).text or "").strip()
+            txt = re.sub(r"[^\d]", "", txt)
+            return int(txt) if txt else 0
+        except Exception:
+            return 0
+
+    views    = get_int("li.samsung-tile-views b")
+    comments = get_int("li.samsung-tile-replies b")
+    likes    = get_int("li.samsung-tile-kudos b")
+
+    return listing_row(page, title, href, snippet, *meta, likes, comments, views)
+
+def listing_row(page: int, title: str, href: str, snippet: str, author_name: str, date_part: str,
+                time_part: str, category: str, author_raw: str, likes: int, comments: int, views: int) -> dict:
+    """Tile fields -> output row (AuthorRaw text-split fallback for a missing author / category)."""
+    if (not author_name or not category) and author_raw:
+        s = parse_author_field(author_raw)
+        author_name = author_name or (s.iloc[0] if len(s) > 0 else "")
+        date_part   = date_part   or (s.iloc[1] if len(s) > 1 else "")
+        time_part   = time_part   or (s.iloc[2] if len(s) > 2 else "")
+        category    = category    or (s.iloc[3] if len(s) > 3 else "")
+
+    row = {
+        "Title": title,
+        "URL": href,
+        "AuthorName": author_name,
+        "Date": date_part,
+        "Time": time_part,
+        "Category": category,
+        "Likes": likes,
+        "Comments": comments,
+        "Views": views,
+        "Snippet": snippet,
+        "ListingPage": page,
+    }
+    if KEEP_AUTHOR_RAW:
+        row["AuthorRaw"] = author_raw
+    return row
+
+# Every tile's fields in one execute_script round trip (the per-field path costs dozens of
+# chromedriver calls per tile). Mirrors parse_listing_tile + extract_author_meta_from_tile;
+# a tile the script cannot read comes back null and goes through the Python parsers.
+TILE_EXTRACT_JS = r"""
+const [tileSelector, authorSelectors] = arguments;
+const txt = el => ((el && el.innerText) || "").trim();
+const num = el => { const d = txt(el).replace(/[^0-9]/g, ""); return d ? parseInt(d, 10) : 0; };
+return Array.from(document.querySelectorAll(tileSelector)).map(tile => {
+  try {
+    const a = tile.querySelector("h3 a");
+    if (!a) return null;
+    const out = {
+      title: txt(a), href: a.getAttribute("href") ? a.href : "",
+      snippet: txt(tile.querySelector("div.content-wrapper")),
+      author: "", stamp: "", category: "", author_raw: "",
+      views: num(tile.querySelector("li.samsung-tile-views b")),
+      comments: num(tile.querySelector("li.samsung-tile-replies b")),
+      likes: num(tile.querySelector("li.samsung-tile-kudos b")),
+    };
+    const ab = tile.querySelector("div.author");
+    if (ab) {
+      out.author_raw = txt(ab);
+      for (const sel of authorSelectors) {
+        const hit = Array.from(ab.querySelectorAll(sel)).map(txt).find(Boolean);
+        if (hit) { out.author = hit; break; }
+      }
+      if (!out.author) out.author = out.author_raw.split("\n").map(s => s.trim()).find(Boolean) || "";
+      for (const t of ab.querySelectorAll("abbr[title], time")) {
+        out.stamp = (t.getAttribute("title") || txt(t)).trim();
+        if (out.stamp) break;
+      }
+      for (const link of Array.from(ab.querySelectorAll("a")).reverse()) {
+        const t = txt(link), cls = link.getAttribute("class") || "", href = link.href || "";
+        if (!t || cls.includes("login") || cls.includes("UserAvatar")) continue;
+        if (href.includes("/t5/user/") || href.includes("/user/viewprofilepage")) continue;
+        out.category = t;
+        break;
+      }
+    }
+    return out;
+  } catch (e) {
+    return null;
+  }
+});
+"""
+
+def extract_tiles_js(driver, tile_selector: str):
+    """-> one dict (or None) per tile, in page order, from a single execute_script; None if the script fails."""
+    try:
+        items = driver.execute_script(TILE_EXTRACT_JS, tile_selector, AUTHOR_SELECTORS)
+    except Exception as e:
+        print("JS tile extraction failed, using the Python parsers:", e)
+        return None
+    return items if isinstance(items, list) else None
+
+def rows_from_tile_items(items, page: int, seen_urls: set, tiles=None) -> list:
+    """extract_tiles_js output -> rows; a None item is re-read from tiles() (lazy element list) by parse_listing_tile."""
+    rows, elements = [], None
+    for i, it in enumerate(items):
+        try:
+            if it is None:
+                if tiles is None:
+                    continue
+                elements = elements if elements is not None else tiles()
+                row = parse_listing_tile(elements[i], page, seen_urls)
+            else:
+                href = normalize_url(it.get("href") or "")
+                if not href or href in seen_urls:
+                    continue
+                seen_urls.add(href)
+                date_part, time_part = split_stamp(it.get("stamp") or it.get("author_raw") or "")
+                row = listing_row(page, it.get("title") or "", href, it.get("snippet") or "",
+                                  it.get("author") or "", date_part, time_part, it.get("category") or "",
+                                  it.get("author_raw") or "", int(it.get("likes") or 0),
+                                  int(it.get("comments") or 0), int(it.get("views") or 0))
+            if row is not None:
+                rows.append(row)
+        except Exception as e:
+            print("Tile parse error:", e)
+    return rows
+
+def crawl_listing_page(driver, page: int, seen_urls: set, market: str = MARKET) -> list:
+    """Load one listing page (ct-p / bd-p candidates) and parse its tiles; [] if it never loads."""
+    page_urls = MARKETS[market]["listing_candidates"](page)
+    print(f"\n=== {market} Listing page {page} ===")
 
     try:
-        tile_selector, landed = wait_for_tiles_or_retry(page_urls)
+        tile_selector, landed = wait_for_tiles_or_retry(driver, page_urls)
         print(f"✓ Landed: {landed} | selector: {tile_selector}")
     except Exception as e:
         print(f"× Could not load tiles for page {page}: {e}")
-        continue
+        return []
+
+    items = extract_tiles_js(driver, tile_selector) if TILE_EXTRACT == "js" else None
+    if items is not None:
+        print(f"Found {len(items)} tiles on page {page}")
+        return rows_from_tile_items(items, page, seen_urls,
+                                    tiles=lambda: driver.find_elements(By.CSS_SELECTOR, tile_selector))
 
     tiles = driver.find_elements(By.CSS_SELECTOR, tile_selector)
     print(f"Found {len(tiles)} tiles on page {page}")
 
+    rows = []
     for post in tiles:
         try:
-            # Title + URL
-            a = post.find_element(By.CSS_SELECTOR, "h3 a")
-            title = (a.text or "").strip()
-            href = normalize_url(a.get_attribute("href") or "")
+            row = parse_listing_tile(post, page, seen_urls)
+            if row is not None:
+                rows.append(row)
+        except Exception as e:
+            print("Tile parse error:", e)
+    return rows
 
-            if not href or href in seen_urls:
-                continue
-            seen_urls.add(href)
+def listing_urls(market: str, page: int, base: str = BASE) -> list:
+    """The market's ct-p / bd-p candidate URLs for one page (base swaps the host, e.g. a local test server)."""
+    return [u.replace(BASE, base, 1) for u in MARKETS[market]["listing_candidates"](page)]
 
-            # Snippet
-            try:
-                snippet = (post.find_element(By.CSS_SELECTOR, "div.content-wrapper").text or "").strip()
-            except Exception:
-                snippet = ""
+def _find_tiles(doc):
+    for sel in TILE_SELECTORS:
+        tiles = doc.cssselect(sel)
+        if tiles:
+            return sel, tiles
+    return None, []
 
-            # Author metadata (DOM-first + fallback)
-            author_name, date_part, time_part, category, author_raw = extract_author_meta_from_tile(post)
+def listing_has_tiles(page_html: str) -> bool:
+    try:
+        return bool(_find_tiles(lxml_html.fromstring(page_html))[1])
+    except Exception:
+        return False
+
+def parse_listing_html(page_html: str, page: int, seen_urls: set, page_url: str = BASE) -> list:
+    """Served listing page -> rows, through the same tile parsers as the Selenium path."""
+    doc = lxml_html.fromstring(page_html)
+    for abbr in doc.cssselect("div.author abbr[title]"):  # as force_full_timestamps does in the browser
+        abbr[:] = []
+        abbr.text = abbr.get("title")
+    tile_selector, tiles = _find_tiles(doc)
+    print(f"Found {len(tiles)} tiles on page {page} (HTTP) | selector: {tile_selector}")
+    rows = []
+    for post in tiles:
+        try:
+            row = parse_listing_tile(LxmlElement(post, page_url), page, seen_urls)
+            if row is not None:
+                rows.append(row)
+        except Exception as e:
+            print("Tile parse error:", e)
+    return rows
 
-            if (not author_name or not category) and author_raw:
-                s = parse_author_field(author_raw)
-                author_name = author_name or (s.iloc[0] if len(s) > 0 else "")
-                date_part   = date_part   or (s.iloc[1] if len(s) > 1 else "")
-                time_part   = time_part   or (s.iloc[2] if len(s) > 2 else "")
-                category    = category    or (s.iloc[3] if len(s) > 3 else "")
+def round_robin(groups) -> list:
+    """Interleave lists one item at a time ([[a1, a2, a3], [b1]] -> [a1, b1, a2, a3])."""
+    groups = [list(g) for g in groups]
+    return [g[i] for i in range(max(map(len, groups), default=0)) for g in groups if i < len(g)]
 
-            # Counts
-            def get_int(css):
-                try:
-                    txt = (post.find_element(By.CSS_SELECTOR, css).text or "").strip()
-                    txt = re.sub(r"[^\d]", "", txt)
-                    return int(txt) if txt else 0
-                except Exception:
-                    return 0
-
-            views    = get_int("li.samsung-tile-views b")
-            comments = get_int("li.samsung-tile-replies b")
-            likes    = get_int("li.samsung-tile-kudos b")
-
-            row = {
-                "Title": title,
-                "URL": href,
-                "AuthorName": author_name,
-                "Date": date_part,
-                "Time": time_part,
-                "Category": category,
-                "Likes": likes,
-                "Comments": comments,
-                "Views": views,
-                "Snippet": snippet,
-                "ListingPage": page,
-            }
-            if KEEP_AUTHOR_RAW:
-                row["AuthorRaw"] = author_raw
-
-            all_rows.append(row)
+def iter_listing_markets(plan: dict, mode: str = LISTING_MODE, base: str = BASE,
+                         n_drivers: int = LISTING_WORKERS):
+    """
+    plan: {market: pages}. Yield (market, page, rows) with every market's pages in page order and
+    the markets interleaved page by page, so no market waits behind another's whole range. A page
+    is yielded as soon as it and all pages before it are done. All pages share one AsyncCrawler,
+    run on a background thread (the markets live on one host, so HTTP_CONCURRENCY / HTTP_RPS
+    cover the whole run), and one pool of n_drivers Chrome drivers, which starts on a page as soon
+    as the HTTP path has given up on it. Rows are de-duplicated across pages within each market
+    (first page wins).
+    """
+    jobs = round_robin([(m, p) for p in pages] for m, pages in plan.items())
+    served = {j: Future() for j in jobs}   # -> (html, landed_url), or None if Chrome has the page
+    browser = {}                           # job -> Future of the Chrome rows
+    stopping = threading.Event()
 
-        except Exception as e:
-            print("Tile parse error:", e)
+    def crawl(drv, job):
+        market, page = job
+        return crawl_listing_page(drv, page, set(), market=market)
 
-# Build dataframe
-df = pd.DataFrame(all_rows)
+    def landed(job, hit):
+        if hit is None and not stopping.is_set():
+            browser[job] = ex.submit(pool.fetch, job, crawl, [])  # before set_result: the reader needs it
+        served[job].set_result(hit)
+
+    async def run_http():
+        async with AsyncCrawler() as crawler:
+            await crawler.fetch_listing_pages(jobs, base, on_page=landed)
+
+    def http_thread(loop, task):
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:  # crawler could not run at all: Chrome takes every page left
+            print(f"× Listing over HTTP failed: {e}")
+        finally:
+            loop.close()
+            for j in jobs:
+                if not served[j].done():
+                    landed(j, None)
+
+    # Listing drivers are closed before detail drivers spawn (reduces resource usage)
+    pool = DriverPool(n_drivers, make_driver=new_listing_driver)
+    ex = ThreadPoolExecutor(max_workers=max(1, n_drivers))
+    loop = task = th = None
+    try:
+        if mode == "http":
+            loop = asyncio.new_event_loop()
+            task = loop.create_task(run_http())
+            th = threading.Thread(target=http_thread, args=(loop, task), daemon=True)
+            th.start()
+        else:
+            for j in jobs:
+                landed(j, None)
+        seen_urls = {m: set() for m in plan}
+        for job in jobs:
+            market, page = job
+            hit = served[job].result()
+            if hit is not None:
+                page_html, landed_url = hit
+                print(f"\n=== {market} Listing page {page} ===")
+                print(f"✓ Landed: {landed_url}")
+                page_rows = parse_listing_html(page_html, page, set(), landed_url)
+            else:
+                try:
+                    page_rows = browser[job].result()
+                except Exception as e:  # no driver could be started
+                    print(f"× Could not load tiles for {market} page {page}: {e}")
+                    page_rows = []
+            fresh = [r for r in page_rows if r["URL"] not in seen_urls[market]]
+            seen_urls[market].update(r["URL"] for r in fresh)
+            yield market, page, fresh
+        if mode == "http":
+            n_http = sum(f.result() is not None for f in served.values())
+            print(f"Listing over HTTP: {n_http}/{len(jobs)} pages | Selenium fallback: {len(jobs) - n_http}")
+    finally:
+        stopping.set()
+        if th is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:  # loop already closed: the crawl is over
+                pass
+            th.join()
+        ex.shutdown(wait=True, cancel_futures=True)
+        pool.close()
+
+def iter_listing(pages, market: str = MARKET, mode: str = LISTING_MODE, base: str = BASE,
+                 n_drivers: int = LISTING_WORKERS):
+    """
+    Yield (page, rows) in page order, de-duplicated across pages (first page wins), as soon as a
+    page and all pages before it are done. mode "http" fetches every page concurrently
+    (AsyncCrawler); pages whose served HTML has no tiles are crawled concurrently by up to
+    n_drivers Chrome drivers. Each page is parsed on its own and only the in-order merge touches
+    the shared seen-URL set, so the result matches a sequential crawl.
+    """
+    for _, page, rows in iter_listing_markets({market: pages}, mode, base, n_drivers):
+        yield page, rows
+
+def crawl_listing(pages, market: str = MARKET, mode: str = LISTING_MODE, base: str = BASE,
+                  n_drivers: int = LISTING_WORKERS) -> list:
+    """Rows of all listing pages, in page order (see iter_listing)."""
+    return [r for _, rows in iter_listing(pages, market, mode, base, n_drivers) for r in rows]
+
+def add_listing_columns(df: pd.DataFrame, sub_code: str = SUB_CODE) -> pd.DataFrame:
+    """Month / Sub / cleaned Snippet (in place; no-op on an empty frame)."""
+    if not df.empty:
+        df["Month"] = df["Date"].apply(month_from_date)
+        df["Sub"] = sub_code
+        df["Snippet"] = df["Snippet"].apply(clean_snippet)
+    return df
+
+def fetch_details(urls, n_workers: int = N_WORKERS, mode: str = DETAIL_MODE) -> dict:
+    """
+    -> {url: (full_post_text, replies_text_concat, replies_count, reply_records)}.
+    mode "http": every page through the AsyncCrawler first; n_workers Chrome drivers only for the rest.
+    """
+    results = {}
+    if mode == "http":
+        results = fetch_details_http(urls)
+        rest = [u for u in urls if u not in results]
+        print(f"  HTTP fast path: {len(urls) - len(rest)}/{len(urls)} pages | Selenium fallback: {len(rest)}")
+        urls = rest
+    if urls:
+        with DriverPool(n_workers) as pool:
+            results.update(pool.run(urls))
+    return results
+
+def save_output(df: pd.DataFrame, outfile: str = OUTFILE) -> None:
+    if OUTPUT_FORMAT == "parquet":
+        df = apply_scraper_schema(df)
+        df.to_parquet(outfile, index=False)
+        if EXCEL_EXPORT:
+            df.to_excel(os.path.splitext(outfile)[0] + ".xlsx", index=False)
+    else:
+        df.to_excel(outfile, index=False)
+
+def save_markets_output(frames: dict, outfile: str) -> None:
+    """
+    One file for a multi-market run, partitioned by Sub: xlsx gets one sheet per Sub, parquet one
+    table with a "Sheet" column (= Sub) that llmclassifier.py splits back into per-market sheets.
+    """
+    if OUTPUT_FORMAT == "parquet":
+        parts = [apply_scraper_schema(df).assign(Sheet=sub) for sub, df in frames.items()]
+        df = pd.concat(parts, ignore_index=True) if parts else apply_scraper_schema(pd.DataFrame()).assign(Sheet="")
+        df["Sheet"] = df["Sheet"].astype("string")
+        df.to_parquet(outfile, index=False)
+        if not EXCEL_EXPORT:
+            return
+        outfile = os.path.splitext(outfile)[0] + ".xlsx"
+    with pd.ExcelWriter(outfile) as xw:
+        for sub, df in (frames or {"Sheet1": pd.DataFrame()}).items():
+            df.to_excel(xw, sheet_name=sub[:31], index=False)
 
 # ---------------------------
-# 2) Transform / clean
+# MULTI-MARKET RUN
 # ---------------------------
-if not df.empty:
-    df["Month"] = df["Date"].apply(month_from_date)
-    df["Sub"] = SUB_CODE
-    df["Snippet"] = df["Snippet"].apply(clean_snippet)
-
-# Listing timing
-t1 = time.perf_counter()
-print(f"\n⏱ Listing phase done in {t1 - t0:.1f}s | rows={len(df)}")
+def markets_plan(markets=None) -> dict:
+    """MARKETS_TO_CRAWL (dict of (start, stop) or list of markets) -> {market: range of pages}."""
+    markets = MARKETS_TO_CRAWL if markets is None else markets
+    if not isinstance(markets, dict):
+        markets = {m: (START_PAGE, STOP_PAGE) for m in markets}
+    return {m: range(start, stop + 1) for m, (start, stop) in markets.items()}
+
+def markets_outfile(plan: dict) -> str:
+    name = "samsung_members_" + "_".join(m.lower() for m in plan)
+    ranges = {(p.start, p.stop - 1) for p in plan.values()}
+    if len(ranges) == 1:
+        (start, stop), = ranges
+        name += f"_page{start:02}" if start == stop else f"_page{start:02}to{stop:02}"
+    return os.path.join(desktop, f"{name}.{OUTPUT_FORMAT}")
+
+def crawl_markets(plan: dict, n_workers: int = N_WORKERS, mode: str = LISTING_MODE,
+                  base: str = BASE) -> dict:
+    """
+    Listing + detail pages of several markets in one run -> {sub_code: DataFrame}. Listing pages
+    go through iter_listing_markets; detail pages of all markets through one fetch_details call
+    (one crawler, one driver pool), interleaved market by market so each progresses evenly.
+    """
+    t0 = time.perf_counter()
+    rows = {m: [] for m in plan}
+    for market, _, page_rows in iter_listing_markets(plan, mode, base):
+        rows[market] += page_rows
+    frames = {MARKETS[m]["sub_code"]: add_listing_columns(pd.DataFrame(r), MARKETS[m]["sub_code"])
+              for m, r in rows.items()}
+    print(f"\n⏱ Listing phase done in {time.perf_counter() - t0:.1f}s | "
+          + " | ".join(f"{sub}={len(df)}" for sub, df in frames.items()))
+
+    urls = list(dict.fromkeys(round_robin(df["URL"].tolist() for df in frames.values() if not df.empty)))
+    if urls:
+        print(f"Starting detail fetch for {len(urls)} URLs across {len(frames)} markets "
+              f"({DETAIL_MODE}; {n_workers} Chrome workers for the rest)...")
+        t2 = time.perf_counter()
+        results = fetch_details(urls, n_workers)
+        print(f"⏱ Detail phase done in {time.perf_counter() - t2:.1f}s")
+        for df in frames.values():
+            if df.empty:
+                continue
+            details = pd.DataFrame([detail_row(results.get(u, EMPTY_DETAIL)) for u in df["URL"]],
+                                   columns=list(DETAIL_COLUMNS), index=df.index)
+            for c in DETAIL_COLUMNS:
+                df[c] = details[c]
+    return frames
+
+def main_markets(markets=None):
+    plan = markets_plan(markets)
+    outfile = markets_outfile(plan)
+    frames = crawl_markets(plan)
+    save_markets_output(frames, outfile)
+
+    print(f"\n✅ Saved -> {outfile}")
+    for m, pages in plan.items():
+        sub = MARKETS[m]["sub_code"]
+        print(f"Rows: {len(frames[sub])} | Pages: {pages.start}..{pages.stop - 1} | Market: {m}")
 
 # ---------------------------
-# 3) Fetch FULL post text + Replies (PARALLEL)
+# MAIN
 # ---------------------------
-# Close listing driver before worker drivers spawn (reduces resource usage)
-try:
-    driver.quit()
-except Exception:
-    pass
+def main():
+    # 1) Crawl listing pages and collect unique URLs
+    t0 = time.perf_counter()
+    all_rows = crawl_listing(range(START_PAGE, STOP_PAGE + 1))
 
-full_texts, replies_texts, replies_counts = [], [], []
+    # 2) Transform / clean
+    df = add_listing_columns(pd.DataFrame(all_rows))
 
-urls = df["URL"].tolist() if (not df.empty and "URL" in df.columns) else []
-if urls:
-    # Round-robin chunk split
-    chunks = [urls[i::N_WORKERS] for i in range(N_WORKERS)]
+    # Listing timing
+    t1 = time.perf_counter()
+    print(f"\n⏱ Listing phase done in {t1 - t0:.1f}s | rows={len(df)}")
 
-    print(f"Starting detail fetch with {N_WORKERS} workers for {len(urls)} URLs...")
-    t2 = time.perf_counter()
+    # 3) Fetch FULL post text + Replies (PARALLEL)
+    urls = df["URL"].tolist() if (not df.empty and "URL" in df.columns) else []
+    if urls:
+        print(f"Starting detail fetch for {len(urls)} URLs ({DETAIL_MODE}; {N_WORKERS} Chrome workers for the rest)...")
+        t2 = time.perf_counter()
+        results = fetch_details(urls, N_WORKERS)
 
-    results = {}
-    with ThreadPoolExecutor(max_workers=N_WORKERS) as ex:
-        futures = [ex.submit(worker, chunk) for chunk in chunks if chunk]
-        done_n = 0
-        for fut in as_completed(futures):
-            batch = fut.result()
-            results.update(batch)
-            done_n += len(batch)
-            print(f"  ...detail progress: {done_n}/{len(urls)}")
-
-    # Stitch back in original order
-    for i, u in enumerate(urls, start=1):
-        main_txt, rep_txt, rep_cnt = results.get(u, ("", "", 0))
-        full_texts.append(main_txt)
-        replies_texts.append(rep_txt)
-        replies_counts.append(rep_cnt)
-
-    t3 = time.perf_counter()
-    print(f"⏱ Detail phase done in {t3 - t2:.1f}s")
-
-    df["FullText"] = full_texts
-    df["Replies"] = replies_texts
-    df["RepliesCount"] = replies_counts
+        # Stitch back in original order
+        details = pd.DataFrame([detail_row(results.get(u, EMPTY_DETAIL)) for u in urls],
+                               columns=list(DETAIL_COLUMNS), index=df.index)
+
+        t3 = time.perf_counter()
+        print(f"⏱ Detail phase done in {t3 - t2:.1f}s")
+
+        for c in DETAIL_COLUMNS:
+            df[c] = details[c]
+
+    # 4) Save to Desktop
+    save_output(df, OUTFILE)
+
+    print(f"\n✅ Saved -> {OUTFILE}")
+    print(f"Rows: {len(df)} | Pages: {START_PAGE}..{STOP_PAGE} | Market: {MARKET}")
 
-# ---------------------------
-# 4) Save to Desktop
-# ---------------------------
-df.to_excel(OUTFILE, index=False)
 
-t_end = time.perf_counter()
-print(f"\n✅ Saved -> {OUTFILE}")
-print(f"Rows: {len(df)} | Pages: {START_PAGE}..{STOP_PAGE} | Market: {MARKET}")
-print(f"⏱ Total runtime: {t_end - t0:.1f}s")
\ No newline at end of file
+if __name__ == "__main__":
+    if MARKETS_TO_CRAWL:
+        main_markets()
+    else:
+        main()
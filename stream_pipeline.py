@@ -0,0 +1,204 @@
+# =========================
+# Streaming Scraper -> Classifier Pipeline
+# =========================
+# Rows flow through bounded queues instead of waiting for the whole crawl + an xlsx hand-off:
+#
+#   listing crawl (1 driver) -> [detail queue] -> N detail workers -> [classify queue]
+#       -> classifier (batches of CLASSIFY_BATCH_ROWS) -> *_classified_ai.xlsx (written as it goes)
+#
+# Both queues are bounded (QUEUE_MAX): a slow classifier blocks the detail workers, slow detail
+# pages block the listing crawl (backpressure), so memory stays flat and end-to-end time is
+# roughly max(crawl, classify) instead of crawl + classify.
+#
+# Usage: edit the SETTINGS in scraper.py, then  python stream_pipeline.py
+
+from __future__ import annotations
+import os, time, queue, threading
+from functools import partial
+import pandas as pd
+
+import scraper as S
+import llmclassifier as L
+
+QUEUE_MAX = 200             # rows waiting in each queue before producers block
+CLASSIFY_BATCH_ROWS = 50    # rows per classification round
+FLUSH_SECONDS = 10.0        # classify a partial round after waiting this long
+
+_DONE = object()            # end-of-stream marker (one per detail worker)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up (-> False) once stop is set, so no thread hangs on a full queue."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def listing_rows(pages, market: str = S.MARKET):
+    """Rows from the listing pages, page by page in order (S.iter_listing: de-duplicated across pages)."""
+    for _, rows in S.iter_listing(pages, market):
+        yield from rows
+
+
+def stream_pipeline(pages=None, market: str = S.MARKET, out_path: str | None = None,
+                    n_workers: int = S.N_WORKERS,
+                    rows_source=None,
+                    fetcher_factory=None,
+                    batch_rows: int = CLASSIFY_BATCH_ROWS,
+                    flush_seconds: float = FLUSH_SECONDS,
+                    queue_max: int = QUEUE_MAX,
+                    concurrency: int = L.MAX_CONCURRENCY,
+                    rule_threshold: float | None = None,
+                    cache_path: str | None = None,
+                    verbose: bool = True) -> str:
+    """
+    Crawl + classify in one pass. rows_source (default: listing_rows over pages) yields listing
+    rows; fetcher_factory() is called once per detail worker (default: S.detail_fetcher in
+    S.DETAIL_MODE, all workers sharing one HTTP client and one S.DriverPool). Output rows keep listing order.
+    If classifying or writing fails, the crawl threads are stopped and the error is re-raised.
+    """
+    pages = pages if pages is not None else range(S.START_PAGE, S.STOP_PAGE + 1)
+    rows_source = rows_source if rows_source is not None else listing_rows(pages, market)
+    sub_code = S.MARKETS[market]["sub_code"]
+    if out_path is None:
+        out_path = os.path.splitext(S.OUTFILE)[0] + "_classified_ai.xlsx"
+
+    client = pool = None
+    if fetcher_factory is None:
+        client = S.new_http_client(max_connections=n_workers * 2) if S.DETAIL_MODE == "http" else None
+        pool = S.DriverPool(n_workers)
+        fetcher_factory = partial(S.detail_fetcher, S.DETAIL_MODE, client, pool=pool)
+
+    detail_q = queue.Queue(maxsize=queue_max)
+    classify_q = queue.Queue(maxsize=queue_max)
+    errors = []
+    stop = threading.Event()  # set when the consumer fails: producers stop instead of blocking
+    t0 = time.perf_counter()
+    crawl_done = [None]
+
+    def produce():
+        n = 0
+        try:
+            for n, row in enumerate(rows_source, start=1):
+                if not _put(detail_q, (n - 1, row), stop):  # blocks while the detail workers are behind
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            if hasattr(rows_source, "close"):
+                rows_source.close()  # stops the listing crawl (drivers, HTTP) when we break early
+            for _ in range(n_workers):
+                _put(detail_q, _DONE, stop)
+            if verbose:
+                print(f"⏱ Listing done: {n} rows in {time.perf_counter() - t0:.1f}s")
+
+    def detail_worker():
+        try:
+            fetch, close = fetcher_factory()
+        except Exception as e:
+            errors.append(e)
+            fetch, close = (lambda url: S.EMPTY_DETAIL), (lambda: None)
+        try:
+            while not stop.is_set():
+                try:
+                    item = detail_q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                seq, row = item
+                try:
+                    row.update(S.detail_row(fetch(row["URL"])))
+                except Exception:
+                    row.update(S.detail_row(S.EMPTY_DETAIL))
+                if not _put(classify_q, (seq, row), stop):  # blocks while the classifier is behind
+                    break
+        finally:
+            try:
+                close()
+            except Exception:
+                pass
+            crawl_done[0] = time.perf_counter() - t0
+            _put(classify_q, _DONE, stop)
+
+    # classifier state shared by every round
+    limiter = L.RateLimiter(L.RPM_LIMIT, L.TPM_LIMIT)
+    cache = L.LabelCache(cache_path) if cache_path else None
+    recorder = L.MetricsRecorder(os.path.splitext(out_path)[0] + ".metrics.jsonl")
+
+    def classify(texts, authors, keys=None):
+        return L.classify_texts(texts, authors=authors, rule_threshold=rule_threshold, cache=cache,
+                                sheet=sub_code, metrics=recorder, concurrency=concurrency, limiter=limiter)
+
+    writer = L.StreamingSheetWriter(out_path)
+    n_written = 0
+
+    def flush(rows):
+        nonlocal n_written
+        if not rows:
+            return
+        t = time.perf_counter()
+        df = S.apply_scraper_schema(S.add_listing_columns(pd.DataFrame(rows), sub_code))
+        writer.append(sub_code, L.process_sheet(df, classify, verbose=False))
+        n_written += len(rows)
+        if verbose:
+            print(f"  ...classified + written {n_written} rows (+{len(rows)} in {time.perf_counter() - t:.1f}s)")
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=detail_worker, daemon=True) for _ in range(n_workers)]
+    for th in threads:
+        th.start()
+    if verbose:
+        print(f"🚚 Streaming {market}: {n_workers} detail workers, rounds of {batch_rows} rows → {out_path}")
+
+    # consumer: re-order by listing sequence, classify in rounds
+    pending, ready, next_seq, done_workers = {}, [], 0, 0
+    last_flush = time.monotonic()
+    try:
+        while done_workers < n_workers:
+            try:
+                item = classify_q.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            if item is _DONE:
+                done_workers += 1
+            elif item is not None:
+                pending[item[0]] = item[1]
+            while next_seq in pending:
+                ready.append(pending.pop(next_seq))
+                next_seq += 1
+            if len(ready) >= batch_rows or (ready and time.monotonic() - last_flush >= flush_seconds):
+                flush(ready)
+                ready, last_flush = [], time.monotonic()
+        flush(ready + [pending[k] for k in sorted(pending)])
+    except BaseException:
+        stop.set()  # producer / workers give up on their next put or get and exit
+        raise
+    finally:
+        for th in threads:
+            th.join()
+        writer.close()
+        if client is not None:
+            client.close()
+        if pool is not None:
+            pool.close()
+        if cache is not None:
+            cache.close()
+        summ = recorder.close()
+
+    if errors:
+        print(f"⚠️ {len(errors)} producer/worker error(s); first: {errors[0]}")
+    if verbose:
+        total = time.perf_counter() - t0
+        print(f"\n✅ Saved -> {out_path}")
+        print(f"Rows: {n_written} | crawl {crawl_done[0] or 0:.1f}s | end-to-end {total:.1f}s | "
+              f"API batches {summ['batches']}, est. ${summ['est_cost_usd']:.4f}")
+    return out_path
+
+
+if __name__ == "__main__":
+    stream_pipeline()